@@ -0,0 +1,258 @@
+import math
+import threading
+import time
+from Common.metrics import Histogram, metrics, render_counters, render_gauges, render_histograms
+from Common.registry import load_state
+from Common.settings import (
+    ADMISSION_ENABLED,
+    ADMISSION_SLOTS,
+    ADMISSION_ROUTE_LIMITS,
+    ADMISSION_LARGE_ROWS,
+    ADMISSION_LARGE_SLOTS,
+    ADMISSION_DEADLINE_MS,
+    ADMISSION_LARGE_DEADLINE_MS,
+    ADMISSION_MAX_QUEUE,
+)
+
+# Row-equivalents charged per request on top of its rows (parsing, aggregation, response)
+REQUEST_OVERHEAD_ROWS = 50
+# Weight of the newest observation in each lane's seconds-per-row estimate
+COST_SMOOTHING = 0.2
+# Timings dropped at the start of each lane (first calls pay one-off warm-up costs)
+COST_WARM_UP_SAMPLES = 1
+# Rough size of one NDJSON day line, to estimate a streamed request's rows from its length
+NDJSON_BYTES_PER_ROW = 64
+
+
+class Overloaded(Exception):
+    """
+    A request was not admitted. status is 429 (the lane's queue is full) or
+    503 (it would wait longer than the lane's deadline); retry_after is the
+    expected wait in whole seconds.
+    """
+
+    def __init__(self, status, retry_after, message):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def payload_rows(data):
+    """
+    Number of entries in a JSON payload: every entry of every day in
+    days_data (a day may be a single entry or a list of them), the longest
+    column of columnar days_data, and the sum over /ml/batch sections.
+    """
+    if not isinstance(data, dict):
+        return 1
+    if isinstance(data.get('sections'), list):
+        return sum(payload_rows(section) for section in data['sections'])
+    days_data = data.get('days_data')
+    if isinstance(days_data, list):
+        return sum(len(day) if isinstance(day, list) else 1 for day in days_data)
+    if isinstance(days_data, dict):
+        return max((len(column) for column in days_data.values() if isinstance(column, list)), default=1)
+    return 1
+
+
+def request_rows(request):
+    """
+    Estimated rows of a Flask request: counted in the parsed JSON body, or
+    derived from Content-Length for NDJSON streams (unknown lengths count as
+    large).
+    """
+    if request.mimetype == 'application/x-ndjson':
+        if request.content_length is None:
+            return ADMISSION_LARGE_ROWS
+        return request.content_length // NDJSON_BYTES_PER_ROW
+    return payload_rows(request.get_json(silent=True))
+
+
+class Ticket:
+    __slots__ = ('lane', 'route', 'cost', 'started', 'load_state', 'released')
+
+    def __init__(self, lane, route, cost):
+        self.lane = lane
+        self.route = route
+        self.cost = cost
+        self.started = time.perf_counter()
+        # A request that waited for a model to load says nothing about its cost
+        self.load_state = load_state()
+        self.released = False
+
+    def release(self):
+        # Safe to call more than once (error paths and streamed responses both release)
+        if not self.released:
+            self.released = True
+            self.lane.release(self)
+
+
+# Requests sharing a fixed number of execution slots, with a bounded wait for one
+class Lane:
+    """
+    Admits up to slots requests at a time, and at most the route's limit per
+    route. Others wait, but only while the expected wait stays within the
+    deadline: the expected wait is the cost (rows) already running and queued
+    ahead, times the observed seconds per row, spread over the slots. Requests
+    that overlapped a model load, and the lane's first timed request, are not
+    used for the seconds-per-row estimate.
+    """
+
+    def __init__(self, name, slots, deadline_seconds, max_queue, route_limits):
+        self.name = name
+        self.slots = slots
+        self.deadline_seconds = deadline_seconds
+        self.max_queue = max_queue
+        self.route_limits = route_limits
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.in_flight_cost = 0
+        self.route_in_flight = {}
+        self.queued = 0
+        self.queued_cost = 0
+        self.max_queued = 0
+        self.seconds_per_row = 0.0
+        self.cost_samples = 0
+        self.admitted = 0
+        self.rejected = {}
+        self.waits = Histogram()
+
+    def can_run(self, route):
+        return (self.in_flight < self.slots
+                and self.route_in_flight.get(route, 0) < self.route_limits.get(route, self.slots))
+
+    def expected_wait(self, cost_ahead):
+        # Running requests are assumed half done
+        return (self.in_flight_cost / 2 + cost_ahead) * self.seconds_per_row / self.slots
+
+    def reject(self, status, wait, message):
+        self.rejected[status] = self.rejected.get(status, 0) + 1
+        return Overloaded(status, max(1, math.ceil(wait)), message)
+
+    def acquire(self, route, rows):
+        """
+        Wait for a slot and return the Ticket to release when done. Raises
+        Overloaded straight away when the queue is full or the expected wait
+        is over the deadline, or once the deadline passes without a slot.
+        """
+        cost = rows + REQUEST_OVERHEAD_ROWS
+        arrived = time.perf_counter()
+        with self._condition:
+            if not self.can_run(route):
+                if self.queued >= self.max_queue:
+                    raise self.reject(429, self.expected_wait(self.queued_cost),
+                                      f"Too many queued requests in the {self.name} lane, retry later.")
+                wait = self.expected_wait(self.queued_cost)
+                if wait > self.deadline_seconds:
+                    raise self.reject(503, wait, f"Service busy: expected wait {wait:.1f}s in the {self.name} lane.")
+
+                self.queued += 1
+                self.queued_cost += cost
+                self.max_queued = max(self.max_queued, self.queued)
+                try:
+                    deadline = arrived + self.deadline_seconds
+                    while not self.can_run(route):
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            raise self.reject(503, self.expected_wait(self.queued_cost),
+                                              f"Service busy: no slot in the {self.name} lane within the deadline.")
+                        self._condition.wait(remaining)
+                finally:
+                    self.queued -= 1
+                    self.queued_cost -= cost
+
+            self.in_flight += 1
+            self.in_flight_cost += cost
+            self.route_in_flight[route] = self.route_in_flight.get(route, 0) + 1
+            self.admitted += 1
+            self.waits.observe(time.perf_counter() - arrived)
+        return Ticket(self, route, cost)
+
+    def release(self, ticket):
+        observed = (time.perf_counter() - ticket.started) / ticket.cost
+        current_load_state = load_state()
+        with self._condition:
+            self.in_flight -= 1
+            self.in_flight_cost -= ticket.cost
+            self.route_in_flight[ticket.route] -= 1
+            # Only time requests during which no model was loading or got loaded
+            if ticket.load_state is not None and ticket.load_state == current_load_state:
+                self.cost_samples += 1
+                if self.cost_samples == COST_WARM_UP_SAMPLES + 1:
+                    self.seconds_per_row = observed
+                elif self.cost_samples > COST_WARM_UP_SAMPLES + 1:
+                    self.seconds_per_row += COST_SMOOTHING * (observed - self.seconds_per_row)
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'slots': self.slots,
+                'deadline_ms': self.deadline_seconds * 1000,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'max_queued': self.max_queued,
+                'queued_cost': self.queued_cost,
+                'admitted': self.admitted,
+                'rejected': {str(status): count for status, count in self.rejected.items()},
+                'mean_wait_ms': self.waits.total / self.waits.count * 1000 if self.waits.count else 0,
+                'expected_wait_ms': self.expected_wait(self.queued_cost) * 1000,
+                'seconds_per_row': self.seconds_per_row,
+                'cost_samples': self.cost_samples
+            }
+
+
+# Admission control in front of the CPU-bound routes
+class AdmissionControl:
+    """
+    Sends requests of large_rows rows or more to a separate 'large' lane, so a
+    year-long upload waits for (and occupies) its own slots instead of stalling
+    every small request behind it. Each worker process has its own lanes.
+    """
+
+    def __init__(self, slots, route_limits, large_rows, large_slots, deadline_seconds, large_deadline_seconds, max_queue):
+        self.large_rows = large_rows
+        self.lanes = {
+            'standard': Lane('standard', slots, deadline_seconds, max_queue, route_limits),
+            'large': Lane('large', large_slots, large_deadline_seconds, max_queue, route_limits)
+        }
+
+    def admit(self, route, rows):
+        return self.lanes['large' if rows >= self.large_rows else 'standard'].acquire(route, rows)
+
+    def stats(self):
+        return {
+            'large_rows': self.large_rows,
+            'lanes': {name: lane.stats() for name, lane in self.lanes.items()}
+        }
+
+    def collect_metrics(self, lines):
+        gauges = {}
+        rejected = {}
+        waits = {}
+        for name, lane in self.lanes.items():
+            with lane._condition:
+                gauges[(name, 'queued')] = lane.queued
+                gauges[(name, 'in_flight')] = lane.in_flight
+                rejected.update({(name, str(status)): count for status, count in lane.rejected.items()})
+                waits[(name,)] = lane.waits
+        render_gauges(lines, 'ml_admission_requests', 'Requests queued for or running in each admission lane.',
+                      ('lane', 'state'), gauges)
+        render_counters(lines, 'ml_admission_rejected_total', 'Requests turned away by admission control, by status.',
+                        ('lane', 'status'), rejected)
+        render_histograms(lines, 'ml_admission_wait_seconds', 'Time admitted requests waited for a slot.',
+                          ('lane',), waits)
+
+
+admission = None
+if ADMISSION_ENABLED:
+    admission = AdmissionControl(ADMISSION_SLOTS, ADMISSION_ROUTE_LIMITS, ADMISSION_LARGE_ROWS, ADMISSION_LARGE_SLOTS,
+                                 ADMISSION_DEADLINE_MS / 1000, ADMISSION_LARGE_DEADLINE_MS / 1000, ADMISSION_MAX_QUEUE)
+    metrics.collectors.append(admission.collect_metrics)
+
+
+def admission_stats():
+    if admission is None:
+        return {'enabled': False}
+    return dict(enabled=True, **admission.stats())
@@ -0,0 +1,133 @@
+import calendar
+import numpy as np
+
+MONTH_NAMES = list(calendar.month_name)[1:]
+
+
+def build_day_to_month(year_length):
+    """
+    int8 lookup from day-of-year (1-based) to month index 0-11; index 0 and
+    days past the end of the year map to -1.
+    """
+    days_per_month = [calendar.monthrange(2024 if year_length == 366 else 2023, month)[1] for month in range(1, 13)]
+    lookup = np.full(367, -1, dtype=np.int8)
+    lookup[1:year_length + 1] = np.repeat(np.arange(12, dtype=np.int8), days_per_month)
+    return lookup
+
+
+DAY_TO_MONTH = build_day_to_month(365)
+LEAP_DAY_TO_MONTH = build_day_to_month(366)
+
+
+def day_to_month_lookup(year=None):
+    """
+    Calendar-correct day→month table for the given year; a common (non-leap)
+    year when the year is not known.
+    """
+    return LEAP_DAY_TO_MONTH if year is not None and calendar.isleap(int(year)) else DAY_TO_MONTH
+
+
+# Running accumulators for one calendar month
+class MonthState:
+    __slots__ = ('sums', 'counts', 'risk_counts', 'categories')
+
+    def __init__(self, pollutants):
+        self.sums = dict.fromkeys(pollutants, 0.0)
+        self.counts = dict.fromkeys(pollutants, 0)
+        self.risk_counts = {}
+        self.categories = {}
+
+    def means(self):
+        return {pollutant: self.sums[pollutant] / self.counts[pollutant] if self.counts[pollutant] else 0
+                for pollutant in self.sums}
+
+    def to_dict(self):
+        """
+        JSON-serializable copy of the accumulators (risk keys become lists).
+        """
+        return {
+            'sums': self.sums,
+            'counts': self.counts,
+            'risk_counts': [[pollutant, level, count] for (pollutant, level), count in self.risk_counts.items()],
+            'categories': list(self.categories)
+        }
+
+    @classmethod
+    def from_dict(cls, pollutants, data):
+        state = cls(pollutants)
+        state.sums.update(data['sums'])
+        state.counts.update(data['counts'])
+        state.risk_counts = {(pollutant, level): count for pollutant, level, count in data['risk_counts']}
+        state.categories = dict.fromkeys(data['categories'])
+        return state
+
+
+# Constant-memory monthly aggregation over a stream of prediction records
+class MonthlyAggregator:
+    """
+    Folds prediction records into per-month running sums, counts, risk-level
+    counts and category sets, so memory does not grow with the number of days.
+    Records are (day, emissions, risks, category) where emissions follow the
+    pollutant order given at construction and risks is an iterable of
+    (pollutant, risk level) pairs. Days outside the year are ignored.
+    """
+
+    def __init__(self, pollutants, year=None):
+        self.pollutants = list(pollutants)
+        self.lookup = day_to_month_lookup(year)
+        self.months = [MonthState(self.pollutants) for _ in MONTH_NAMES]
+
+    def month_index(self, day):
+        """
+        Month index 0-11 of a day of the year, or -1 when it is outside the year.
+        """
+        return int(self.lookup[day]) if 0 < day < len(self.lookup) else -1
+
+    def add(self, day, emissions, risks, category=None):
+        if not 0 < day < len(self.lookup):
+            return
+        month_index = self.lookup[day]
+        if month_index < 0:
+            return
+
+        state = self.months[month_index]
+        for pollutant, value in zip(self.pollutants, emissions):
+            state.sums[pollutant] += value
+            state.counts[pollutant] += 1
+
+        risk_counts = state.risk_counts
+        for risk_key in risks:
+            risk_counts[risk_key] = risk_counts.get(risk_key, 0) + 1
+
+        if category is not None:
+            state.categories[category] = None
+
+    def consume(self, records):
+        """
+        Fold an iterable (or generator) of records, so aggregation can run as
+        predictions are produced.
+        """
+        for day, emissions, risks, category in records:
+            self.add(day, emissions, risks, category)
+        return self
+
+    def merge(self, other):
+        """
+        Fold another aggregator of the same pollutants into this one, e.g. the
+        partial aggregates of chunks scored in separate processes. Merging in
+        input order keeps the category and risk-level order of a single pass.
+        """
+        for state, other_state in zip(self.months, other.months):
+            for pollutant in self.pollutants:
+                state.sums[pollutant] += other_state.sums[pollutant]
+                state.counts[pollutant] += other_state.counts[pollutant]
+            for risk_key, count in other_state.risk_counts.items():
+                state.risk_counts[risk_key] = state.risk_counts.get(risk_key, 0) + count
+            state.categories.update(other_state.categories)
+        return self
+
+    def summaries(self):
+        """
+        (month name, MonthState) for all twelve months in calendar order.
+        """
+        return list(zip(MONTH_NAMES, self.months))
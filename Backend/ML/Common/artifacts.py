@@ -0,0 +1,102 @@
+import os
+import joblib
+from Common.forest import CompiledForest
+from Common.settings import ARTIFACT_FORMAT
+
+
+def mmap_path(model_path):
+    """
+    Location of the memory-mappable artifact built from a pickled forest.
+    """
+    return os.path.splitext(model_path)[0] + '.mmap'
+
+
+def write_mmap_artifact(model, path):
+    """
+    Store the compiled node arrays of a forest uncompressed, so joblib can
+    memory-map them. Written to a temporary file first so concurrent workers
+    never read a partial artifact.
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(CompiledForest.from_model(model).arrays(), temporary_path)
+    os.replace(temporary_path, path)
+
+
+def load_mmap_forest(model_path):
+    """
+    Open a forest as a CompiledForest whose arrays are memory-mapped read-only,
+    so every worker process on the host shares one page-cache copy. The
+    artifact is (re)built from the pickle when missing or older than it.
+    """
+    path = mmap_path(model_path)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(model_path):
+        write_mmap_artifact(joblib.load(model_path), path)
+    forest = CompiledForest(joblib.load(path, mmap_mode='r'))
+    forest.source_path = path
+    return forest
+
+
+def load_forest(model_path):
+    """
+    Load a pickled forest, or its memory-mapped compiled form when
+    ML_ARTIFACT_FORMAT=mmap.
+    """
+    if ARTIFACT_FORMAT == 'mmap':
+        return load_mmap_forest(model_path)
+    return joblib.load(model_path)
+
+
+def read_smaps(smaps_path='/proc/self/smaps'):
+    """
+    Sum Rss/shared/private kilobytes per mapped file of this process (Linux only).
+    """
+    usage = {}
+    current = None
+    try:
+        with open(smaps_path) as smaps:
+            for line in smaps:
+                fields = line.split()
+                if not fields:
+                    continue
+                if not fields[0].endswith(':') or '-' in fields[0]:
+                    current = usage.setdefault(' '.join(fields[5:]), {}) if len(fields) > 5 else None
+                elif current is not None and fields[0] in ('Rss:', 'Shared_Clean:', 'Shared_Dirty:', 'Private_Clean:', 'Private_Dirty:'):
+                    current[fields[0][:-1]] = current.get(fields[0][:-1], 0) + int(fields[1])
+    except OSError:
+        return None
+    return usage
+
+
+def memory_report(models):
+    """
+    Per-model resident vs shared memory of the memory-mapped forest files, plus
+    the process totals. models maps a model name to its ModelArtifacts.
+    """
+    usage = read_smaps()
+    report = {}
+    for name, model_artifacts in models.items():
+        entry = {'artifact': None, 'array_bytes': None, 'rss_kb': None, 'shared_kb': None, 'private_kb': None}
+        if model_artifacts.ready:
+            artifacts = model_artifacts.get()
+            model = artifacts.model
+            if isinstance(model, CompiledForest):
+                entry['artifact'] = getattr(model, 'source_path', None)
+                entry['array_bytes'] = model.nbytes
+            if usage is not None and entry['artifact']:
+                mapped = usage.get(os.path.realpath(entry['artifact']), {})
+                entry['rss_kb'] = mapped.get('Rss', 0)
+                entry['shared_kb'] = mapped.get('Shared_Clean', 0) + mapped.get('Shared_Dirty', 0)
+                entry['private_kb'] = mapped.get('Private_Clean', 0) + mapped.get('Private_Dirty', 0)
+        report[name] = entry
+
+    process = {}
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'RssAnon', 'RssFile', 'RssShmem'):
+                    process[key] = value.strip()
+    except OSError:
+        pass
+
+    return {'models': report, 'process': process}
@@ -0,0 +1,167 @@
+import os
+import queue
+import threading
+import time
+import numpy as np
+from Common.settings import MICRO_BATCH_WINDOW_MS, MICRO_BATCH_MAX_ROWS
+
+# Upper bounds of the batch-size histogram buckets (rows per executed batch)
+BATCH_ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, float('inf'))
+
+
+class PendingRows:
+    __slots__ = ('X', 'enqueued', 'done', 'result', 'error')
+
+    def __init__(self, X):
+        self.X = X
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def concatenate_rows(parts):
+    if hasattr(parts[0], 'iloc'):
+        import pandas as pd  # Keep DataFrame inputs (and their feature names) as DataFrames
+        return pd.concat(parts, ignore_index=True)
+    return np.concatenate([np.asarray(part) for part in parts])
+
+
+# Request coalescer in front of a model's predict callable
+class MicroBatcher:
+    """
+    Collects feature rows from concurrent callers for up to window_seconds (or
+    until max_rows are waiting), runs one predict over all of them and hands
+    every caller its own slice of the result. Inputs of max_rows or more skip
+    the queue. Counts batch sizes and queue waits so the window can be tuned.
+    """
+
+    def __init__(self, name, predict, window_seconds, max_rows):
+        self.name = name
+        self.predict_rows = predict
+        self.window_seconds = window_seconds
+        self.max_rows = max_rows
+        self._stats_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.batches = 0
+            self.requests = 0
+            self.rows = 0
+            self.direct_requests = 0
+            self.max_batch_rows = 0
+            self.batch_row_counts = [0] * len(BATCH_ROW_BUCKETS)
+            self.queue_wait_seconds = 0.0
+            self.max_queue_wait_seconds = 0.0
+
+    def _ensure_worker(self):
+        # The worker thread does not survive a fork, so each process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, name=f"micro-batch-{self.name}", daemon=True).start()
+                self._pid = os.getpid()
+
+    def predict(self, X):
+        if len(X) >= self.max_rows:
+            with self._stats_lock:
+                self.direct_requests += 1
+            return self.predict_rows(X)
+
+        self._ensure_worker()
+        pending = PendingRows(X)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            rows = len(batch[0].X)
+            deadline = batch[0].enqueued + self.window_seconds
+            while rows < self.max_rows:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                rows += len(pending.X)
+            self._execute(batch, rows)
+
+    def _execute(self, batch, rows):
+        started = time.perf_counter()
+        try:
+            predictions = self.predict_rows(concatenate_rows([pending.X for pending in batch]))
+            offset = 0
+            for pending in batch:
+                pending.result = predictions[offset:offset + len(pending.X)]
+                offset += len(pending.X)
+        except Exception:
+            # Isolate the failing request(s): rerun each caller's rows on their own
+            for pending in batch:
+                try:
+                    pending.result = self.predict_rows(pending.X)
+                except Exception as e:
+                    pending.error = e
+
+        self._record(batch, rows, started)
+        for pending in batch:
+            pending.done.set()
+
+    def _record(self, batch, rows, started):
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.rows += rows
+            self.max_batch_rows = max(self.max_batch_rows, rows)
+            self.batch_row_counts[next(i for i, bound in enumerate(BATCH_ROW_BUCKETS) if rows <= bound)] += 1
+            for pending in batch:
+                wait = started - pending.enqueued
+                self.queue_wait_seconds += wait
+                self.max_queue_wait_seconds = max(self.max_queue_wait_seconds, wait)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'window_ms': self.window_seconds * 1000,
+                'max_rows': self.max_rows,
+                'batches': self.batches,
+                'requests': self.requests,
+                'direct_requests': self.direct_requests,
+                'rows': self.rows,
+                'mean_batch_rows': self.rows / self.batches if self.batches else 0,
+                'mean_requests_per_batch': self.requests / self.batches if self.batches else 0,
+                'max_batch_rows': self.max_batch_rows,
+                'batch_rows_histogram': {str(bound): count for bound, count in zip(BATCH_ROW_BUCKETS, self.batch_row_counts)},
+                'mean_queue_wait_ms': self.queue_wait_seconds / self.requests * 1000 if self.requests else 0,
+                'max_queue_wait_ms': self.max_queue_wait_seconds * 1000
+            }
+
+
+batchers = {}
+
+
+def micro_batched(name, predict):
+    """
+    Put a MicroBatcher in front of predict when ML_MICRO_BATCH_WINDOW_MS > 0,
+    otherwise return predict unchanged.
+    """
+    if MICRO_BATCH_WINDOW_MS <= 0:
+        return predict
+    batchers[name] = MicroBatcher(name, predict, MICRO_BATCH_WINDOW_MS / 1000, MICRO_BATCH_MAX_ROWS)
+    return batchers[name].predict
+
+
+def batching_stats():
+    return {name: batcher.stats() for name, batcher in batchers.items()}
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from Common.registry import models, reload_listeners
+from Common.settings import RESULT_CACHE_SIZE, RESULT_CACHE_TTL
+
+
+def payload_digest(data):
+    """
+    SHA-256 of the parsed payload in canonical JSON (sorted keys, no
+    whitespace), so re-posts that only differ in key order or formatting match.
+    """
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class Flight:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+# Whole-response cache for the model pipelines
+class ResultCache:
+    """
+    LRU cache of pipeline results keyed by (model, model version, payload
+    digest), holding at most max_entries results for ttl_seconds each.
+    Concurrent misses on the same key are single-flight: the first caller
+    computes, the others wait for its result (or its exception). Errors are
+    never cached. Entries of a model are dropped when it is reloaded.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, model, data, compute):
+        models[model].get()  # Load first, so the key carries the version the result is computed with
+        key = (model, models[model].version, payload_digest(data))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+            flight = self._flights.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._flights[key] = Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                # Don't store a result computed while the model was being reloaded
+                if flight.error is None and key[1] == models[model].version:
+                    self._store(key, flight.value)
+            flight.done.set()
+
+        return flight.value
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, model=None):
+        """
+        Drop the cached results of one model, or of all models.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if model is None or key[0] == model]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'entries': len(self._entries),
+                'in_flight': len(self._flights),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_ratio': (self.hits + self.coalesced) / lookups if lookups else 0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+
+# Shared cache for the model routes; None when ML_RESULT_CACHE_SIZE is 0
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL) if RESULT_CACHE_SIZE > 0 else None
+
+if result_cache is not None:
+    reload_listeners.append(lambda artifacts: result_cache.invalidate(artifacts.name))
+
+
+def cached(model, data, compute):
+    """
+    compute() through the result cache when it is enabled; data is the part
+    of the payload the result depends on.
+    """
+    if result_cache is None:
+        return compute()
+    return result_cache.get_or_compute(model, data, compute)
+
+
+def cache_stats():
+    return result_cache.stats() if result_cache is not None else {'enabled': False}
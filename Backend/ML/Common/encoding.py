@@ -0,0 +1,145 @@
+import difflib
+import re
+import threading
+from collections import Counter, OrderedDict
+import numpy as np
+from Common.metrics import metrics, render_counters, timed
+from Common.settings import METRICS_ENABLED
+
+# What to do with a value the encoder never saw during training:
+#   'placeholder' - encode it as PLACEHOLDER_CODE
+#   'reject'      - raise ValueError naming the unseen values
+#   'alias'       - map it to the closest known class (case/spacing-insensitive,
+#                   then fuzzy match), falling back to the placeholder
+UNSEEN_POLICIES = ('placeholder', 'reject', 'alias')
+PLACEHOLDER_CODE = -1
+# Most recently used unseen values whose alias is kept
+MAX_ALIASES = 1024
+# Distinct unseen values counted per encoder; rarer values are folded into OTHER_UNSEEN
+MAX_UNSEEN_VALUES = 100
+OTHER_UNSEEN = '(other)'
+
+
+def normalize_category(value):
+    return re.sub(r'[\s_\-]+', ' ', value).strip().casefold()
+
+
+# Dict-backed replacement for per-call LabelEncoder.transform
+class CategoryEncoder:
+    """
+    Encodes categories with the same codes as a fitted LabelEncoder, using a
+    plain dict built once from its classes_. Whole columns are encoded in one
+    pass; unseen values are handled by the configured policy and counted per
+    value in unseen_counts, which keeps the MAX_UNSEEN_VALUES most frequent
+    values and counts the rest under OTHER_UNSEEN. Resolved aliases are kept
+    in a bounded LRU.
+    """
+
+    def __init__(self, label_encoder, name, unseen_policy='placeholder'):
+        if unseen_policy not in UNSEEN_POLICIES:
+            raise ValueError(f"Unknown unseen-category policy '{unseen_policy}', expected one of {UNSEEN_POLICIES}")
+
+        self.name = name
+        self.unseen_policy = unseen_policy
+        self.classes = list(label_encoder.classes_)
+        self.mapping = {category: code for code, category in enumerate(self.classes)}
+        self.normalized_mapping = {}
+        for code, category in enumerate(self.classes):
+            self.normalized_mapping.setdefault(normalize_category(str(category)), code)
+        self.aliases = OrderedDict()
+        self.unseen_counts = Counter()
+        self._lock = threading.Lock()
+        encoders[name] = self
+
+    def _count_unseen(self, values):
+        counts = self.unseen_counts
+        for value, count in Counter(str(value) for value in values).items():
+            if value not in counts and len(counts) - (OTHER_UNSEEN in counts) >= MAX_UNSEEN_VALUES:
+                # Full: the least frequent value makes room (its count moves to OTHER_UNSEEN)
+                rarest = min((key for key in counts if key != OTHER_UNSEEN), key=counts.get)
+                counts[OTHER_UNSEEN] += counts.pop(rarest)
+            counts[value] += count
+
+    def _resolve_alias(self, value):
+        if value in self.aliases:
+            self.aliases.move_to_end(value)
+            return self.aliases[value]
+
+        code = PLACEHOLDER_CODE
+        if isinstance(value, str):
+            normalized = normalize_category(value)
+            code = self.normalized_mapping.get(normalized, PLACEHOLDER_CODE)
+            if code == PLACEHOLDER_CODE:
+                matches = difflib.get_close_matches(normalized, list(self.normalized_mapping), n=1, cutoff=0.8)
+                if matches:
+                    code = self.normalized_mapping[matches[0]]
+
+        self.aliases[value] = code
+        if len(self.aliases) > MAX_ALIASES:
+            self.aliases.popitem(last=False)
+        return code
+
+    @timed('encode')
+    def encode(self, values):
+        """
+        Encode a sequence of categories into an int64 array of class codes.
+        """
+        mapping = self.mapping
+        codes = np.fromiter(
+            (mapping.get(value, PLACEHOLDER_CODE) if isinstance(value, str) else PLACEHOLDER_CODE for value in values),
+            dtype=np.int64,
+            count=len(values)
+        )
+
+        unseen_positions = np.flatnonzero(codes == PLACEHOLDER_CODE)
+        if len(unseen_positions) == 0:
+            return codes
+
+        unseen_values = [values[position] for position in unseen_positions]
+        with self._lock:
+            self._count_unseen(unseen_values)
+
+        if self.unseen_policy == 'reject':
+            unique_unseen = sorted({str(value) for value in unseen_values})
+            raise ValueError(f"Unseen {self.name} value(s): {unique_unseen}")
+
+        if self.unseen_policy == 'alias':
+            with self._lock:
+                codes[unseen_positions] = [
+                    self._resolve_alias(value) if isinstance(value, (str, int, float)) else PLACEHOLDER_CODE
+                    for value in unseen_values
+                ]
+
+        return codes
+
+
+# Latest encoder built under each name (models rebuild theirs when reloaded)
+encoders = {}
+
+
+def unseen_stats():
+    """
+    Unseen-value counts per encoder: its policy, total and counts per value.
+    """
+    stats = {}
+    for name, encoder in encoders.items():
+        with encoder._lock:
+            stats[name] = {
+                'policy': encoder.unseen_policy,
+                'total': sum(encoder.unseen_counts.values()),
+                'values': dict(encoder.unseen_counts.most_common())
+            }
+    return stats
+
+
+def collect_metrics(lines):
+    counts = {}
+    for name, encoder in encoders.items():
+        with encoder._lock:
+            counts.update({(name, value): count for value, count in encoder.unseen_counts.items()})
+    render_counters(lines, 'ml_unseen_categories_total', 'Category values the encoders never saw during training.',
+                    ('encoder', 'value'), counts)
+
+
+if METRICS_ENABLED:
+    metrics.collectors.append(collect_metrics)
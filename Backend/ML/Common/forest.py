@@ -0,0 +1,134 @@
+import numpy as np
+from Common.settings import INFERENCE_MODE
+from Common.batching import micro_batched
+from Common.memo import memoized
+from Common.metrics import timed
+
+
+# Flat-array evaluator for fitted RandomForestRegressor models
+class CompiledForest:
+    """
+    All trees of a fitted forest concatenated into contiguous node arrays
+    (feature, threshold, left, right, value) and evaluated for a whole batch
+    with vectorized NumPy traversal, skipping sklearn's per-call validation.
+
+    Leaves point to themselves, so every sample can take exactly max_depth
+    steps without branching on whether it has already reached a leaf.
+    Inputs are compared as float32, like sklearn's tree code.
+    """
+
+    def __init__(self, arrays, chunk_size=4096):
+        # Arrays may be memory-mapped (see Common/artifacts.py); they are only read
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.max_depth = int(arrays['max_depth'])
+        self.n_outputs = int(arrays['n_outputs'])
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_model(cls, model, chunk_size=4096):
+        return cls(compile_arrays(model), chunk_size)
+
+    def arrays(self):
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'value': self.value,
+            'roots': self.roots,
+            'max_depth': np.int64(self.max_depth),
+            'n_outputs': np.int64(self.n_outputs)
+        }
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.feature, self.threshold, self.left, self.right, self.value, self.roots))
+
+    def split_thresholds(self, feature):
+        """
+        Every split threshold on the given feature (leaves excluded).
+        """
+        is_split = self.left != np.arange(len(self.left))
+        return np.asarray(self.threshold[is_split & (self.feature == feature)])
+
+    def _predict_chunk(self, X):
+        rows = np.arange(len(X))[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].mean(axis=1)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        predictions = np.empty((len(X), self.value.shape[1]))
+        for start in range(0, len(X), self.chunk_size):
+            predictions[start:start + self.chunk_size] = self._predict_chunk(X[start:start + self.chunk_size])
+
+        return predictions[:, 0] if self.n_outputs == 1 else predictions
+
+
+def compile_arrays(model):
+    """
+    Concatenate the nodes of every tree in a fitted forest into flat arrays.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        values.append(tree.value.reshape(tree.node_count, -1))
+        roots.append(offset)
+
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return {
+        'feature': np.concatenate(features).astype(np.intp),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts).astype(np.intp),
+        'right': np.concatenate(rights).astype(np.intp),
+        'value': np.concatenate(values),
+        'roots': np.array(roots, dtype=np.intp),
+        'max_depth': np.int64(max_depth),
+        'n_outputs': np.int64(model.n_outputs_)
+    }
+
+
+def forest_predictor(model):
+    """
+    Return the predict callable for a loaded forest: the compiled evaluator when
+    ML_INFERENCE_MODE=compiled or the forest is already compiled (memory-mapped
+    artifacts), otherwise the model's own predict.
+    """
+    if isinstance(model, CompiledForest):
+        return model.predict
+    if INFERENCE_MODE == 'compiled':
+        return CompiledForest.from_model(model).predict
+    return model.predict
+
+
+def build_predictor(name, model):
+    """
+    Return the prediction callable a model module serves its forest with:
+    forest_predictor(model), coalesced across concurrent requests when
+    ML_MICRO_BATCH_WINDOW_MS > 0, deduplicated and memoized per feature row
+    when ML_ROW_MEMO_SIZE > 0, and timed for /metrics when ML_METRICS=1.
+    """
+    return timed('predict', count_rows=True)(memoized(name, micro_batched(name, forest_predictor(model))))
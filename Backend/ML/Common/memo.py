@@ -0,0 +1,128 @@
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+import numpy as np
+from Common.settings import ROW_MEMO_SIZE
+
+
+# Rows seen by memoized predictions during one request (see track_request)
+class DedupCounter:
+    __slots__ = ('rows', 'unique_rows', 'memo_hits')
+
+    def __init__(self):
+        self.rows = 0
+        self.unique_rows = 0
+        self.memo_hits = 0
+
+    @property
+    def dedup_ratio(self):
+        # Share of rows that did not need their own forest evaluation
+        return 1 - (self.unique_rows - self.memo_hits) / self.rows if self.rows else 0.0
+
+
+request_dedup = ContextVar('request_dedup', default=None)
+# /ml/batch sections of one request update its counter from several threads
+_counter_lock = threading.Lock()
+
+
+def track_request():
+    """
+    Start counting memoized rows for the current request (or context).
+    """
+    counter = DedupCounter()
+    request_dedup.set(counter)
+    return counter
+
+
+# Row-level memo in front of a model's predict callable
+class RowMemo:
+    """
+    Deduplicates the feature rows of every call, looks the unique rows up in
+    a bounded LRU of earlier predictions keyed on the row's bytes, sends only
+    the remaining rows to the forest and scatters the results back to every
+    row. Forest predictions are per-row, so results are identical to calling
+    predict on the whole input.
+    """
+
+    def __init__(self, name, predict, max_rows):
+        self.name = name
+        self.predict_rows = predict
+        self.max_rows = max_rows
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.rows = 0
+        self.unique_rows = 0
+        self.memo_hits = 0
+
+    def predict(self, X):
+        values = X.to_numpy(dtype=float) if hasattr(X, 'iloc') else np.asarray(X, dtype=float)
+        if len(values) == 0:
+            return self.predict_rows(X)
+
+        unique_rows, first_index, inverse = np.unique(values, axis=0, return_index=True, return_inverse=True)
+        keys = [row.tobytes() for row in unique_rows]
+
+        with self._lock:
+            results = [self._memo.get(key) for key in keys]
+            for key, result in zip(keys, results):
+                if result is not None:
+                    self._memo.move_to_end(key)
+        missing = [position for position, result in enumerate(results) if result is None]
+
+        if missing:
+            # Keep DataFrame inputs (and their feature names) as DataFrames
+            rows = X.iloc[first_index[missing]] if hasattr(X, 'iloc') else values[first_index[missing]]
+            predicted = np.asarray(self.predict_rows(rows))
+            with self._lock:
+                for position, result in zip(missing, predicted):
+                    # Copy, so a memoized row doesn't keep the whole batch's output alive
+                    results[position] = self._memo[keys[position]] = result.copy()
+                while len(self._memo) > self.max_rows:
+                    self._memo.popitem(last=False)
+
+        hits = len(keys) - len(missing)
+        with self._lock:
+            self.calls += 1
+            self.rows += len(values)
+            self.unique_rows += len(keys)
+            self.memo_hits += hits
+        counter = request_dedup.get()
+        if counter is not None:
+            with _counter_lock:
+                counter.rows += len(values)
+                counter.unique_rows += len(keys)
+                counter.memo_hits += hits
+
+        return np.asarray(results)[inverse.reshape(-1)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_rows': self.max_rows,
+                'entries': len(self._memo),
+                'calls': self.calls,
+                'rows': self.rows,
+                'unique_rows': self.unique_rows,
+                'memo_hits': self.memo_hits,
+                'predicted_rows': self.unique_rows - self.memo_hits,
+                'dedup_ratio': 1 - (self.unique_rows - self.memo_hits) / self.rows if self.rows else 0.0
+            }
+
+
+memos = {}
+
+
+def memoized(name, predict):
+    """
+    Put a RowMemo in front of predict when ML_ROW_MEMO_SIZE > 0, otherwise
+    return predict unchanged.
+    """
+    if ROW_MEMO_SIZE <= 0:
+        return predict
+    memos[name] = RowMemo(name, predict, ROW_MEMO_SIZE)
+    return memos[name].predict
+
+
+def memo_stats():
+    return {name: memo.stats() for name, memo in memos.items()}
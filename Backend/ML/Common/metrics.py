@@ -0,0 +1,187 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from Common.settings import METRICS_ENABLED
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+# (route, model) the current request or /ml/batch section is recorded under
+metric_labels = ContextVar('metric_labels', default=('none', 'none'))
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+# In-process latency histograms and counters, rendered in Prometheus text format
+class Metrics:
+    """
+    Per-stage latency histograms and row counts per (route, model), request
+    latency and counts per (route, status) and error counts per
+    (route, model, kind). Each worker process keeps its own metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.requests = {}
+        self.request_counts = {}
+        self.rows = {}
+        self.errors = {}
+        # Callables appending further metric lines to render()'s output (e.g. admission control)
+        self.collectors = []
+
+    def observe_stage(self, stage, seconds):
+        key = metric_labels.get() + (stage,)
+        with self._lock:
+            histogram = self.stages.get(key)
+            if histogram is None:
+                histogram = self.stages[key] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_request(self, route, status, seconds):
+        with self._lock:
+            histogram = self.requests.get(route)
+            if histogram is None:
+                histogram = self.requests[route] = Histogram()
+            histogram.observe(seconds)
+            self.request_counts[(route, status)] = self.request_counts.get((route, status), 0) + 1
+
+    def count_rows(self, rows):
+        key = metric_labels.get()
+        with self._lock:
+            self.rows[key] = self.rows.get(key, 0) + rows
+
+    def count_error(self, kind):
+        if not METRICS_ENABLED:
+            return
+        key = metric_labels.get() + (kind,)
+        with self._lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            render_histograms(lines, 'ml_stage_duration_seconds', 'Time spent in each pipeline stage.',
+                              ('route', 'model', 'stage'), self.stages)
+            render_histograms(lines, 'ml_request_duration_seconds', 'Time to handle a request, including serialization.',
+                              ('route',), {(route,): histogram for route, histogram in self.requests.items()})
+            render_counters(lines, 'ml_requests_total', 'Requests handled, by response status.',
+                            ('route', 'status'), self.request_counts)
+            render_counters(lines, 'ml_rows_total', 'Feature rows sent to the models.',
+                            ('route', 'model'), self.rows)
+            render_counters(lines, 'ml_errors_total', 'Failed requests and /ml/batch sections (client: bad input, server: unexpected).',
+                            ('route', 'model', 'kind'), self.errors)
+        for collect in self.collectors:
+            collect(lines)
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(names, values, extra=''):
+    labels = ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+    return '{' + ','.join(part for part in (labels, extra) if part) + '}'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def render_histograms(lines, name, help_text, label_names, histograms):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for labels, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+            cumulative += count
+            bucket_label = 'le="' + format_bound(bound) + '"'
+            lines.append(f'{name}_bucket{format_labels(label_names, labels, bucket_label)} {cumulative}')
+        lines.append(f'{name}_sum{format_labels(label_names, labels)} {histogram.total!r}')
+        lines.append(f'{name}_count{format_labels(label_names, labels)} {histogram.count}')
+
+
+def render_counters(lines, name, help_text, label_names, counters):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} counter')
+    for labels, value in sorted(counters.items()):
+        lines.append(f'{name}{format_labels(label_names, labels)} {value}')
+
+
+def render_gauges(lines, name, help_text, label_names, gauges):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} gauge')
+    for labels, value in sorted(gauges.items()):
+        lines.append(f'{name}{format_labels(label_names, labels)} {value}')
+
+
+metrics = Metrics()
+
+
+class StageTimer:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        metrics.observe_stage(self.name, time.perf_counter() - self.started)
+        return False
+
+
+_disabled_stage = nullcontext()
+
+
+def stage(name):
+    """
+    Context manager timing a pipeline stage under the current (route, model);
+    a shared no-op when ML_METRICS is off.
+    """
+    return StageTimer(name) if METRICS_ENABLED else _disabled_stage
+
+
+def timed(name, count_rows=False):
+    """
+    Decorator timing every call of a function as the given stage, optionally
+    counting len() of its first argument (the feature rows) as rows. Returns
+    the function unchanged when ML_METRICS is off, so there is no per-call
+    overhead.
+    """
+    def decorate(function):
+        if not METRICS_ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                metrics.observe_stage(name, time.perf_counter() - started)
+                if count_rows:
+                    metrics.count_rows(len(args[0]))
+        return wrapper
+    return decorate
@@ -0,0 +1,48 @@
+import numpy as np
+from Common.metrics import timed
+
+
+# Category encoding and StandardScaler.transform in one NumPy pass
+class FusedPreprocessor:
+    """
+    Builds the scaled feature matrix [encoded category, numeric columns...]
+    straight from plain sequences or arrays, without a DataFrame. The scaler's
+    mean_/scale_ are read once; every column is written into one preallocated
+    float64 matrix which is then centered and scaled in place with the same
+    operations as StandardScaler.transform, so the features are bit-identical
+    to scaler.transform(DataFrame(...)). Inputs are never modified.
+    """
+
+    def __init__(self, scaler, encoder, category_feature=0):
+        self.encoder = encoder
+        self.category_feature = category_feature
+        self.n_features = scaler.n_features_in_
+        self.mean = np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else None
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else None
+        self.numeric_features = [feature for feature in range(self.n_features) if feature != category_feature]
+
+    @timed('scale')
+    def transform_codes(self, codes, *columns):
+        """
+        Scaled features for already encoded categories and the numeric columns,
+        given in feature order.
+        """
+        if len(columns) != len(self.numeric_features):
+            raise ValueError(f"Expected {len(self.numeric_features)} numeric column(s), got {len(columns)}")
+
+        features = np.empty((len(codes), self.n_features), dtype=np.float64)
+        features[:, self.category_feature] = codes
+        for feature, column in zip(self.numeric_features, columns):
+            features[:, feature] = np.asarray(column, dtype=np.float64)
+
+        if self.mean is not None:
+            features -= self.mean
+        if self.scale is not None:
+            features /= self.scale
+        return features
+
+    def transform(self, categories, *columns):
+        """
+        Scaled features for raw category values and the numeric columns.
+        """
+        return self.transform_codes(self.encoder.encode(categories), *columns)
@@ -0,0 +1,85 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from Common.settings import PROFILE_TOKEN, PROFILE_DIR, PROFILE_TOP_N
+
+# How a request asks to be profiled; the value must equal ML_PROFILE_TOKEN
+PROFILE_HEADER = 'X-ML-Profile'
+PROFILE_QUERY_PARAM = 'profile'
+# Value of the X-ML-Profile response header when a capture was skipped
+PROFILE_BUSY = 'busy'
+
+# Python 3.12+ allows one active profiler per process; captures take turns
+_capture_lock = threading.Lock()
+
+
+def profile_requested(request):
+    """
+    True when profiling is configured and the request carries the token in
+    the X-ML-Profile header or the ?profile= query parameter.
+    """
+    if not PROFILE_TOKEN:
+        return False
+    token = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY_PARAM)
+    return token is not None and hmac.compare_digest(token.encode('utf-8'), PROFILE_TOKEN.encode('utf-8'))
+
+
+def safe_name(value):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', value).strip('_')[:64] or 'root'
+
+
+# cProfile capture of one request
+class RequestProfile:
+    """
+    Profiles the calling thread from start() to stop(), then writes the raw
+    profile (<route>-<timestamp>-<request id>.prof, readable with pstats or
+    snakeviz) and a top-N summary of the hottest functions (.txt) to
+    ML_PROFILE_DIR. Only one request is captured at a time: start() returns
+    None, and the request runs unprofiled, while another capture is running.
+    """
+
+    def __init__(self, route, request_id=None):
+        self.route = route
+        self.request_id = safe_name(request_id or uuid.uuid4().hex)
+        self.profiler = cProfile.Profile()
+        self.started = None
+
+    def start(self):
+        if not _capture_lock.acquire(blocking=False):
+            return None
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # Another profiler (not one of ours) is already active
+            _capture_lock.release()
+            return None
+        self.started = time.perf_counter()
+        return self
+
+    def stop(self):
+        """
+        Stop profiling and write the capture; returns the path of the summary.
+        """
+        self.profiler.disable()
+        _capture_lock.release()
+        elapsed = time.perf_counter() - self.started
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, f"{safe_name(self.route)}-{time.strftime('%Y%m%dT%H%M%S')}-{self.request_id}")
+        self.profiler.dump_stats(base + '.prof')
+
+        summary = io.StringIO()
+        summary.write(f"route: {self.route}\nrequest id: {self.request_id}\nwall time: {elapsed * 1000:.2f} ms\n\n")
+        stats = pstats.Stats(self.profiler, stream=summary).strip_dirs()
+        for sort_key in ('cumulative', 'tottime'):
+            summary.write(f"Top {PROFILE_TOP_N} by {sort_key} time\n")
+            stats.sort_stats(sort_key).print_stats(PROFILE_TOP_N)
+        with open(base + '.txt', 'w') as f:
+            f.write(summary.getvalue())
+        return base + '.txt'
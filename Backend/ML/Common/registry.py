@@ -0,0 +1,161 @@
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Modules the pickled artifacts need. They are imported before the loader
+# threads start: unpickling in several threads at once would otherwise import
+# the same sklearn packages concurrently and can hit an import-lock deadlock.
+PICKLE_MODULES = ('sklearn.ensemble', 'sklearn.preprocessing')
+
+
+# Lazily loaded artifacts (model, scaler, encoders, ...) for one ML model
+class ModelArtifacts:
+    """
+    Wraps a model module's loader so its pickles are only read on first use,
+    or by a background thread at startup. Records load state and timing for
+    the readiness endpoint.
+    """
+
+    def __init__(self, name, loader, warm_up=None):
+        self.name = name
+        self.loader = loader
+        self.warm_up = warm_up
+        self.state = 'not_loaded'
+        self.error = None
+        self.load_seconds = None
+        self.warm_up_seconds = None
+        # Bumped on every successful load, so results computed with older artifacts can be told apart
+        self.version = 0
+        self._artifacts = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Return the loaded artifacts, loading them first if needed. Concurrent
+        callers wait for the one load in progress.
+        """
+        if self._artifacts is not None:
+            return self._artifacts
+
+        loaded = False
+        with self._lock:
+            if self._artifacts is None:
+                self.state = 'loading'
+                started = time.perf_counter()
+                try:
+                    artifacts = self.loader()
+                except Exception as e:
+                    self.state = 'failed'
+                    self.error = str(e)
+                    self.load_seconds = time.perf_counter() - started
+                    raise
+                self.load_seconds = time.perf_counter() - started
+                self.error = None
+                self.state = 'ready'
+                self._artifacts = artifacts
+                self.version += 1
+                loaded = True
+                logger.info("Loaded %s model in %.3fs", self.name, self.load_seconds)
+        if loaded:
+            notify_reload(self)
+        return self._artifacts
+
+    def run_warm_up(self):
+        if self.warm_up is None:
+            return
+        started = time.perf_counter()
+        self.warm_up()
+        self.warm_up_seconds = time.perf_counter() - started
+
+    def reset(self):
+        """
+        Drop the loaded artifacts so the next get() reloads them from disk.
+        """
+        with self._lock:
+            self._artifacts = None
+            self.state = 'not_loaded'
+            self.load_seconds = None
+            self.warm_up_seconds = None
+        notify_reload(self)
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def status(self):
+        return {
+            'state': self.state,
+            'load_seconds': self.load_seconds,
+            'warm_up_seconds': self.warm_up_seconds,
+            'version': self.version,
+            'error': self.error
+        }
+
+
+models = {}
+
+# Called with the ModelArtifacts whenever a model is loaded or reset (e.g. to drop cached results)
+reload_listeners = []
+
+
+def notify_reload(artifacts):
+    for listener in reload_listeners:
+        listener(artifacts)
+
+
+def register_model(name, loader, warm_up=None):
+    models[name] = ModelArtifacts(name, loader, warm_up)
+    return models[name]
+
+
+def load_in_background(warm_up=False):
+    """
+    Start one loader thread per registered model, so startup time is bounded by
+    the slowest model rather than the sum. Returns the started threads.
+    """
+    def load(artifacts):
+        try:
+            artifacts.get()
+            if warm_up:
+                artifacts.run_warm_up()
+        except Exception:
+            logger.exception("Failed to load %s model", artifacts.name)
+
+    for module in PICKLE_MODULES:
+        importlib.import_module(module)
+
+    threads = []
+    for artifacts in models.values():
+        thread = threading.Thread(target=load, args=(artifacts,), name=f"load-{artifacts.name}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def load_all(warm_up=False):
+    """
+    Load every registered model in parallel and wait for all of them.
+    """
+    for thread in load_in_background(warm_up):
+        thread.join()
+
+
+def load_state():
+    """
+    Sum of every model's load count, or None while any model is loading. Two
+    equal, non-None values mean no model was loaded in between.
+    """
+    if any(artifacts.state == 'loading' for artifacts in models.values()):
+        return None
+    return sum(artifacts.version for artifacts in models.values())
+
+
+def readiness():
+    """
+    (all models ready, per-model status) for the readiness endpoint.
+    """
+    statuses = {name: artifacts.status() for name, artifacts in models.items()}
+    return all(artifacts.ready for artifacts in models.values()), statuses
@@ -0,0 +1,75 @@
+import json
+import os
+import numpy as np
+from Common.settings import RISK_THRESHOLDS_PATH
+from Common.metrics import timed
+
+# Boundary semantics of a threshold table:
+#   '<' - a value below threshold i stays in band i, equal values move up
+#         (fuel, transport, electricity)
+#   '>' - a value must strictly exceed threshold i to move up (explosive)
+SEARCH_SIDES = {'<': 'right', '>': 'left'}
+
+
+# Vectorized risk classification for one model
+class RiskTable:
+    """
+    Ascending thresholds per pollutant plus the band labels. classify turns
+    a (rows x pollutants) prediction matrix, or a 1-D vector for single-output
+    models, into band codes with one np.searchsorted per pollutant.
+    """
+
+    def __init__(self, thresholds, labels, compare):
+        if compare not in SEARCH_SIDES:
+            raise ValueError(f"Unknown threshold comparison '{compare}', expected '<' or '>'")
+
+        self.pollutants = list(thresholds)
+        self.thresholds = [np.asarray(levels, dtype=float) for levels in thresholds.values()]
+        self.labels = np.asarray(labels)
+        self.compare = compare
+        self.side = SEARCH_SIDES[compare]
+
+        for pollutant, levels in zip(self.pollutants, self.thresholds):
+            if len(levels) != len(self.labels) - 1 or np.any(np.diff(levels) <= 0):
+                raise ValueError(f"Thresholds for '{pollutant}' must be {len(self.labels) - 1} ascending values")
+
+    def classify(self, predictions):
+        predictions = np.asarray(predictions, dtype=float)
+        if predictions.ndim == 1:
+            return np.searchsorted(self.thresholds[0], predictions, side=self.side)
+
+        codes = np.empty(predictions.shape, dtype=np.intp)
+        for column, levels in enumerate(self.thresholds):
+            codes[:, column] = np.searchsorted(levels, predictions[:, column], side=self.side)
+        return codes
+
+    @timed('risk')
+    def label(self, predictions):
+        """
+        Risk label for every prediction, same shape as the input.
+        """
+        return self.labels[self.classify(predictions)]
+
+    def label_records(self, predictions):
+        """
+        One {pollutant: label} dict per row of a (rows x pollutants) matrix.
+        """
+        return [dict(zip(self.pollutants, row)) for row in self.label(predictions).tolist()]
+
+
+def load_risk_tables(path=None):
+    """
+    Read every model's threshold table from the JSON config
+    (Common/risk_thresholds.json unless ML_RISK_THRESHOLDS points elsewhere).
+    """
+    path = path or RISK_THRESHOLDS_PATH or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'risk_thresholds.json')
+    with open(path) as config_file:
+        config = json.load(config_file)
+
+    return {
+        name: RiskTable(table['thresholds'], table['labels'], table['compare'])
+        for name, table in config.items()
+    }
+
+
+risk_tables = load_risk_tables()
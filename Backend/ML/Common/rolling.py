@@ -0,0 +1,167 @@
+import numpy as np
+
+# Window lengths (days) used when a request just asks for rolling windows
+DEFAULT_WINDOWS = (7, 30)
+MAX_WINDOW = 3660
+
+
+def parse_windows(value):
+    """
+    Window lengths from a request option: true for DEFAULT_WINDOWS, a list of
+    day counts, or a comma-separated string of them (query strings).
+    """
+    if value is True or (isinstance(value, str) and value.strip().lower() in ('1', 'true')):
+        return list(DEFAULT_WINDOWS)
+    if isinstance(value, str):
+        value = [part.strip() for part in value.split(',') if part.strip()]
+    try:
+        windows = sorted({int(window) for window in value})
+    except (TypeError, ValueError):
+        raise ValueError('rolling_windows must be true or a list of window lengths in days.')
+    if not windows or windows[0] < 1 or windows[-1] > MAX_WINDOW:
+        raise ValueError(f"Rolling window lengths must be between 1 and {MAX_WINDOW} days.")
+    return windows
+
+
+def daily_totals(records, pollutants, peak_level, first_day=None, last_day=None):
+    """
+    Per-day sums, entry counts and peak-risk counts (entries in the model's
+    highest risk band) per pollutant, from (day, emissions, risks, category)
+    records. Returns (first day, totals, counts, peaks), each array with one
+    row per day from first_day to last_day (by default the first and last
+    recorded days); records outside that range are ignored.
+    """
+    index = {pollutant: column for column, pollutant in enumerate(pollutants)}
+    days = []
+    emissions = []
+    peak_rows = []
+    peak_columns = []
+    for row, (day, values, risks, _) in enumerate(records):
+        days.append(day)
+        emissions.append(values)
+        for pollutant, level in risks:
+            # Single-output models report their risk without a pollutant name
+            column = index.get(pollutant, 0 if len(pollutants) == 1 else None)
+            if column is not None and level == peak_level:
+                peak_rows.append(row)
+                peak_columns.append(column)
+
+    days = np.asarray(days, dtype=np.int64)
+    if first_day is None:
+        first_day = int(days.min()) if len(days) else 1
+    if last_day is None:
+        last_day = int(days.max()) if len(days) else first_day - 1
+    n_days = max(last_day - first_day + 1, 0)
+    offsets = days - first_day
+    inside = (offsets >= 0) & (offsets < n_days)
+
+    totals = np.zeros((n_days, len(pollutants)))
+    counts = np.zeros((n_days, len(pollutants)))
+    peaks = np.zeros((n_days, len(pollutants)))
+    if len(days):
+        values = np.asarray(emissions, dtype=np.float64).reshape(len(days), len(pollutants))
+        np.add.at(totals, offsets[inside], values[inside])
+        np.add.at(counts, offsets[inside], 1)
+        peak_rows = np.asarray(peak_rows, dtype=np.int64)
+        peak_columns = np.asarray(peak_columns, dtype=np.int64)
+        peak_inside = inside[peak_rows]
+        np.add.at(peaks, (offsets[peak_rows[peak_inside]], peak_columns[peak_inside]), 1)
+    return first_day, totals, counts, peaks
+
+
+def format_windows(pollutants, window, first_day, totals, counts, peaks):
+    """
+    Response body of one window: per pollutant, the window total, mean per
+    entry and peak-risk count ending on each day, plus the highest total.
+    """
+    means = np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0)
+    body = {
+        'first_day': first_day,
+        'last_day': first_day + len(totals) - 1,
+        'complete_from': first_day + window - 1,
+        'pollutants': {}
+    }
+    for column, pollutant in enumerate(pollutants):
+        peak_day = int(np.argmax(totals[:, column])) if len(totals) else 0
+        body['pollutants'][str(pollutant)] = {
+            'total': totals[:, column].tolist(),
+            'mean': means[:, column].tolist(),
+            'peak_risk_count': peaks[:, column].astype(int).tolist(),
+            'max_total': float(totals[peak_day, column]) if len(totals) else 0.0,
+            'max_total_day': first_day + peak_day
+        }
+    return body
+
+
+def rolling_windows(records, pollutants, peak_level, windows=DEFAULT_WINDOWS, first_day=None, last_day=None):
+    """
+    Rolling totals, means and peak-risk counts over every window length for
+    a whole series at once: each window is the difference of two rows of the
+    cumulative per-day sums, so the cost does not depend on the window length.
+    Days without entries count as empty; windows reaching before the first
+    day are partial (see complete_from).
+    """
+    first_day, totals, counts, peaks = daily_totals(records, pollutants, peak_level, first_day, last_day)
+    cumulative = [np.vstack([np.zeros((1, len(pollutants))), np.cumsum(array, axis=0)]) for array in (totals, counts, peaks)]
+    ends = np.arange(1, len(totals) + 1)
+
+    result = {}
+    for window in windows:
+        starts = np.maximum(ends - window, 0)
+        result[str(window)] = format_windows(pollutants, window, first_day,
+                                             *(array[ends] - array[starts] for array in cumulative))
+    return result
+
+
+# Sliding-window state for data that arrives in chunks (NDJSON streams)
+class RollingAccumulator:
+    """
+    Keeps the last window days of per-day sums in a ring buffer per window
+    length, plus their running totals, so each new day is an O(pollutants)
+    update whatever the window length or series length. Chunks must arrive
+    in day order; update() returns the windows ending on each of the chunk's
+    days in the same format as rolling_windows.
+    """
+
+    def __init__(self, pollutants, peak_level, windows=DEFAULT_WINDOWS):
+        self.pollutants = list(pollutants)
+        self.peak_level = peak_level
+        self.windows = list(windows)
+        self.first_day = None
+        # (day sums, entry counts, peak counts) per pollutant, for each window
+        self.buffers = {window: np.zeros((window, 3, len(self.pollutants))) for window in self.windows}
+        self.running = {window: np.zeros((3, len(self.pollutants))) for window in self.windows}
+
+    def add_day(self, day, values):
+        """
+        Slide every window forward to day, given the day's stacked
+        (totals, counts, peaks); returns them per window.
+        """
+        result = {}
+        for window in self.windows:
+            slot = day % window
+            running = self.running[window]
+            running += values - self.buffers[window][slot]
+            self.buffers[window][slot] = values
+            result[window] = running.copy()
+        return result
+
+    def update(self, records, first_day, last_day):
+        """
+        Fold the records of days first_day..last_day and return their windows.
+        """
+        _, totals, counts, peaks = daily_totals(records, self.pollutants, self.peak_level, first_day, last_day)
+        if self.first_day is None:
+            self.first_day = first_day
+        days = np.stack([totals, counts, peaks], axis=1)
+
+        series = {window: np.zeros(days.shape) for window in self.windows}
+        for offset, values in enumerate(days):
+            for window, running in self.add_day(first_day + offset, values).items():
+                series[window][offset] = running
+
+        return {
+            str(window): dict(format_windows(self.pollutants, window, first_day, *np.moveaxis(values, 1, 0)),
+                              complete_from=self.first_day + window - 1)
+            for window, values in series.items()
+        }
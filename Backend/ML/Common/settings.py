@@ -0,0 +1,108 @@
+import os
+
+# Runtime switches for the ML service, read once from the environment.
+
+# How the forests are evaluated:
+#   'forest'   - plain RandomForestRegressor.predict (default)
+#   'table'    - precomputed per-category lookup tables (see Common/surrogate.py)
+#   'compiled' - flat-array NumPy evaluation of every forest (see Common/forest.py)
+INFERENCE_MODE = os.environ.get('ML_INFERENCE_MODE', 'forest').strip().lower()
+
+# Overrides how every category encoder treats unseen values
+# ('placeholder', 'reject' or 'alias', see Common/encoding.py).
+# When unset, each model keeps its own default.
+UNSEEN_CATEGORY_POLICY = os.environ.get('ML_UNSEEN_CATEGORY_POLICY', '').strip().lower() or None
+
+# JSON file with the per-model risk thresholds (defaults to Common/risk_thresholds.json).
+RISK_THRESHOLDS_PATH = os.environ.get('ML_RISK_THRESHOLDS') or None
+
+# When model artifacts are read from disk:
+#   'background' - one loader thread per model as soon as app.py starts (default)
+#   'lazy'       - on the first request that needs the model
+#   'preload'    - all models in parallel, and app.py waits for them before it
+#                  finishes importing (used by serve.py before forking workers)
+MODEL_LOADING = os.environ.get('ML_MODEL_LOADING', 'background').strip().lower()
+
+# Run a dummy prediction through every model once it has loaded ('1' to enable).
+WARM_UP = os.environ.get('ML_WARM_UP', '0').strip() == '1'
+
+# How forests are read from disk:
+#   'pickle' - joblib.load of the .pkl, private to each process (default)
+#   'mmap'   - compiled node arrays in an uncompressed .mmap file next to the
+#              .pkl, memory-mapped so worker processes share one copy
+#              (see Common/artifacts.py)
+ARTIFACT_FORMAT = os.environ.get('ML_ARTIFACT_FORMAT', 'pickle').strip().lower()
+
+# Flask debug mode for the development server (`python app.py`). Never used by serve.py.
+DEBUG = os.environ.get('ML_DEBUG', '1').strip() == '1'
+
+# Micro-batching of concurrent predictions (Common/batching.py): how long the
+# first waiting request may be held to collect more rows (0 disables), and the
+# row count that flushes a batch early
+MICRO_BATCH_WINDOW_MS = float(os.environ.get('ML_MICRO_BATCH_WINDOW_MS', '0'))
+MICRO_BATCH_MAX_ROWS = int(os.environ.get('ML_MICRO_BATCH_MAX_ROWS', '4096'))
+
+# Threads per process running /ml/batch sections concurrently
+BATCH_THREADS = int(os.environ.get('ML_BATCH_THREADS', '0')) or os.cpu_count() or 1
+
+# Production pre-fork server (serve.py)
+SERVER_BIND = os.environ.get('ML_BIND', '127.0.0.1:8800')
+SERVER_WORKERS = int(os.environ.get('ML_WORKERS', '0')) or os.cpu_count() or 1
+# Request threads per worker; more than 1 switches to gunicorn's threaded (gthread) workers
+SERVER_THREADS = int(os.environ.get('ML_THREADS', '1'))
+# Restart a worker after this many requests (plus up to the jitter) to cap memory creep; 0 disables
+SERVER_MAX_REQUESTS = int(os.environ.get('ML_MAX_REQUESTS', '1000'))
+SERVER_MAX_REQUESTS_JITTER = int(os.environ.get('ML_MAX_REQUESTS_JITTER', '100'))
+# Seconds a worker gets to finish in-flight requests on restart/shutdown, and per request
+SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('ML_GRACEFUL_TIMEOUT', '30'))
+SERVER_TIMEOUT = int(os.environ.get('ML_TIMEOUT', '120'))
+
+# Days predicted per chunk (per site) for NDJSON streaming requests (Common/streaming.py)
+STREAM_CHUNK_DAYS = int(os.environ.get('ML_STREAM_CHUNK_DAYS', '64'))
+
+# Whole-response cache for repeated payloads (Common/cache.py): maximum number
+# of cached results (0 disables) and how long each stays valid, in seconds
+RESULT_CACHE_SIZE = int(os.environ.get('ML_RESULT_CACHE_SIZE', '0'))
+RESULT_CACHE_TTL = float(os.environ.get('ML_RESULT_CACHE_TTL', '300'))
+
+# Row-level prediction memo (Common/memo.py): most feature rows remembered per
+# model (LRU); 0 disables the memo and in-batch deduplication
+ROW_MEMO_SIZE = int(os.environ.get('ML_ROW_MEMO_SIZE', '0'))
+
+# Per-stage latency histograms and counters served at /metrics in Prometheus
+# text format (Common/metrics.py); '1' to enable. When off, the timing hooks
+# are not installed at all.
+METRICS_ENABLED = os.environ.get('ML_METRICS', '0').strip() == '1'
+
+# On-demand request profiling (Common/profiling.py): a request to an /ml/* route
+# carrying this token in the X-ML-Profile header or ?profile= runs under
+# cProfile. Unset disables profiling. Captures are written to ML_PROFILE_DIR.
+PROFILE_TOKEN = os.environ.get('ML_PROFILE_TOKEN') or None
+PROFILE_DIR = os.environ.get('ML_PROFILE_DIR', 'profiles')
+PROFILE_TOP_N = int(os.environ.get('ML_PROFILE_TOP_N', '30'))
+
+# Admission control for the /ml/* prediction routes (Common/admission.py); '1' to enable.
+# Requests run in a 'standard' lane of ML_ADMISSION_SLOTS concurrent requests per
+# process, with optional per-route limits ('fuel=2,batch=1'); requests of
+# ML_ADMISSION_LARGE_ROWS entries or more use a separate 'large' lane. A request
+# that would wait longer than its lane's deadline gets 503, one arriving at a
+# full queue 429, both with Retry-After. Route limits are keyed by the path after
+# /ml/ (transport, explosive, fuel, electricity, batch; a leading /ml/ is
+# accepted), and a model's site store appends by '<model>/sites' ('fuel/sites=1').
+ADMISSION_ENABLED = os.environ.get('ML_ADMISSION', '0').strip() == '1'
+ADMISSION_SLOTS = int(os.environ.get('ML_ADMISSION_SLOTS', '0')) or os.cpu_count() or 1
+ADMISSION_ROUTE_LIMITS = {
+    route.strip().removeprefix('/ml/'): int(limit)
+    for route, _, limit in (item.partition('=') for item in os.environ.get('ML_ADMISSION_ROUTE_LIMITS', '').split(','))
+    if route.strip() and limit.strip()
+}
+ADMISSION_LARGE_ROWS = int(os.environ.get('ML_ADMISSION_LARGE_ROWS', '10000'))
+ADMISSION_LARGE_SLOTS = int(os.environ.get('ML_ADMISSION_LARGE_SLOTS', '1'))
+ADMISSION_DEADLINE_MS = float(os.environ.get('ML_ADMISSION_DEADLINE_MS', '2000'))
+ADMISSION_LARGE_DEADLINE_MS = float(os.environ.get('ML_ADMISSION_LARGE_DEADLINE_MS', '30000'))
+ADMISSION_MAX_QUEUE = int(os.environ.get('ML_ADMISSION_MAX_QUEUE', '64'))
+
+# Incremental per-site store (Common/store.py): SQLite file keeping every site's
+# per-day prediction records and monthly aggregates, served by the
+# /ml/<model>/sites/<site>/... routes. Unset disables the store.
+STORE_PATH = os.environ.get('ML_STORE_PATH') or None
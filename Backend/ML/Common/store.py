@@ -0,0 +1,170 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from Common.aggregation import MonthState
+from Common.settings import STORE_PATH
+
+# Sites are keyed by (model, site, year); year 0 stands for "not given"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sites (
+    model TEXT NOT NULL, site TEXT NOT NULL, year INTEGER NOT NULL,
+    next_day INTEGER NOT NULL,
+    PRIMARY KEY (model, site, year)
+);
+CREATE TABLE IF NOT EXISTS days (
+    model TEXT NOT NULL, site TEXT NOT NULL, year INTEGER NOT NULL, day INTEGER NOT NULL,
+    records TEXT NOT NULL,
+    PRIMARY KEY (model, site, year, day)
+);
+CREATE TABLE IF NOT EXISTS months (
+    model TEXT NOT NULL, site TEXT NOT NULL, year INTEGER NOT NULL, month INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (model, site, year, month)
+);
+"""
+
+KEY = 'model = ? AND site = ? AND year = ?'
+
+
+class StoreConflict(Exception):
+    """
+    The site was appended to by another request while this one was predicting;
+    retrying the request appends after the other one.
+    """
+
+
+@contextmanager
+def transaction(connection):
+    # IMMEDIATE takes the write lock up front, so concurrent writers queue instead of failing mid-way
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield connection
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+# Incremental per-site store of predictions and monthly aggregates
+class SiteStore:
+    """
+    Keeps each site's per-day prediction records, (day, emissions, risks,
+    category) as produced by the model's monthly_records, and its running
+    monthly accumulators in SQLite. New days are predicted once and folded
+    into the stored months, so a summary is 12 row reads instead of
+    re-predicting the whole year. Re-sent days replace the stored ones and
+    only their months are rebuilt from the stored records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def connection(self):
+        # sqlite3 connections must not be shared between threads or across a fork
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            local.connection.execute('PRAGMA journal_mode=WAL')
+            local.connection.executescript(SCHEMA)
+            local.pid = os.getpid()
+        return local.connection
+
+    def next_day(self, connection, key):
+        row = connection.execute(f'SELECT next_day FROM sites WHERE {KEY}', key).fetchone()
+        return row[0] if row else None
+
+    def load_months(self, connection, key, aggregator):
+        for month, state in connection.execute(f'SELECT month, state FROM months WHERE {KEY}', key):
+            aggregator.months[month] = MonthState.from_dict(aggregator.pollutants, json.loads(state))
+        return aggregator
+
+    def rebuild_months(self, connection, key, aggregator, month_indexes):
+        """
+        Recompute the given months of aggregator from the site's stored day records.
+        """
+        for month_index in month_indexes:
+            aggregator.months[month_index] = MonthState(aggregator.pollutants)
+        month_days = [day for day in range(1, len(aggregator.lookup)) if aggregator.month_index(day) in month_indexes]
+        rows = connection.execute(f'SELECT day, records FROM days WHERE {KEY} AND day BETWEEN ? AND ? ORDER BY day',
+                                  key + (month_days[0], month_days[-1]))
+        for day, records in rows:
+            for emissions, risks, category in json.loads(records):
+                aggregator.add(day, emissions, [tuple(risk) for risk in risks], category)
+
+    def append(self, model, site, year, pipeline, days, start_day=None):
+        """
+        Predict days, numbered from start_day (by default the day after the
+        site's last stored day), store their records and fold them into the
+        site's months. Returns (first day, predictions, updated aggregator).
+        """
+        connection = self.connection()
+        key = (model, site, year or 0)
+        stored_next_day = self.next_day(connection, key) or 1
+        first_day = stored_next_day if start_day is None else start_day
+        if first_day < 1:
+            raise ValueError('start_day must be 1 or more.')
+        last_day = first_day + len(days) - 1
+
+        # Predict outside the write transaction, so other sites are not blocked meanwhile
+        predictions = pipeline.predict(days, first_day)
+        records = list(pipeline.records(predictions))
+        day_records = {}
+        for day, emissions, risks, category in records:
+            day_records.setdefault(day, []).append([list(emissions), [list(risk) for risk in risks], category])
+
+        aggregator = pipeline.aggregator()
+        with transaction(connection):
+            current_next_day = self.next_day(connection, key) or 1
+            if start_day is None and current_next_day != stored_next_day:
+                raise StoreConflict(f"Site '{site}' was updated concurrently; retry the request.")
+            self.load_months(connection, key, aggregator)
+
+            replaced = first_day < current_next_day
+            if replaced:
+                connection.execute(f'DELETE FROM days WHERE {KEY} AND day BETWEEN ? AND ?', key + (first_day, last_day))
+            connection.executemany('INSERT INTO days (model, site, year, day, records) VALUES (?, ?, ?, ?, ?)',
+                                   [key + (day, json.dumps(entries, default=float)) for day, entries in day_records.items()])
+
+            changed = {aggregator.month_index(day) for day in range(first_day, last_day + 1)} - {-1}
+            if replaced and changed:
+                self.rebuild_months(connection, key, aggregator, changed)
+            else:
+                aggregator.consume(records)
+
+            connection.executemany(
+                'INSERT OR REPLACE INTO months (model, site, year, month, state) VALUES (?, ?, ?, ?, ?)',
+                [key + (month_index, json.dumps(aggregator.months[month_index].to_dict(), default=float))
+                 for month_index in sorted(changed)])
+            connection.execute('INSERT OR REPLACE INTO sites (model, site, year, next_day) VALUES (?, ?, ?, ?)',
+                               key + (max(current_next_day, last_day + 1),))
+        return first_day, predictions, aggregator
+
+    def summary(self, model, site, year, aggregator):
+        """
+        (last stored day, aggregator) with a site's stored months loaded into
+        the given empty aggregator, or None when the site has nothing stored.
+        """
+        connection = self.connection()
+        key = (model, site, year or 0)
+        next_day = self.next_day(connection, key)
+        if next_day is None:
+            return None
+        return next_day - 1, self.load_months(connection, key, aggregator)
+
+    def delete(self, model, site, year):
+        """
+        Remove everything stored for a site; False when there was nothing.
+        """
+        connection = self.connection()
+        key = (model, site, year or 0)
+        with transaction(connection):
+            deleted = connection.execute(f'DELETE FROM sites WHERE {KEY}', key).rowcount
+            connection.execute(f'DELETE FROM days WHERE {KEY}', key)
+            connection.execute(f'DELETE FROM months WHERE {KEY}', key)
+        return deleted > 0
+
+
+store = SiteStore(STORE_PATH) if STORE_PATH else None
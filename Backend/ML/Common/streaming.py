@@ -0,0 +1,102 @@
+import json
+from collections import namedtuple
+
+# How one model's pipeline is driven in chunks:
+#   predict(days, start_day) -> predictions for those days
+#   records(predictions)     -> (day, emissions, risks, category) records
+#   aggregator()             -> empty MonthlyAggregator for one site
+#   summarize(aggregator)    -> monthly summary in the model's response format
+#   rolling()                -> RollingAccumulator for one site, or None when
+#                               rolling windows were not asked for
+StreamPipeline = namedtuple('StreamPipeline', ['predict', 'records', 'aggregator', 'summarize', 'rolling'], defaults=(None,))
+
+
+def read_ndjson(lines):
+    """
+    Parse newline-delimited JSON into (site, day) pairs. Each line is either
+    one day's data, or {"site": ..., "data": <one day's data>} for payloads
+    that mix several sites. Blank lines are skipped.
+    """
+    for line_no, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON on line {line_no}: {e}")
+        if isinstance(item, dict) and 'site' in item and 'data' in item:
+            yield item['site'], item['data']
+        else:
+            yield None, item
+
+
+class SiteStream:
+    """
+    Per-site state while streaming: days waiting to be predicted, the number
+    of the next day, the site's running monthly aggregator and, when asked
+    for, its rolling-window accumulator.
+    """
+
+    def __init__(self, site, pipeline):
+        self.site = site
+        self.pipeline = pipeline
+        self.pending = []
+        self.next_day = 1
+        self.aggregator = pipeline.aggregator()
+        self.rolling = pipeline.rolling() if pipeline.rolling else None
+
+    def flush(self):
+        days, self.pending = self.pending, []
+        first_day = self.next_day
+        self.next_day += len(days)
+        predictions = self.pipeline.predict(days, first_day)
+        records = list(self.pipeline.records(predictions))
+        self.aggregator.consume(records)
+        message = {
+            'type': 'predictions',
+            'site': self.site,
+            'first_day': first_day,
+            'last_day': self.next_day - 1,
+            'predictions': predictions
+        }
+        if self.rolling is not None:
+            message['rolling_windows'] = self.rolling.update(records, first_day, self.next_day - 1)
+        return message
+
+
+def stream_predictions(items, pipeline, chunk_days):
+    """
+    Run (site, day) pairs through a pipeline chunk_days at a time per site,
+    yielding a 'predictions' message for every chunk as soon as it is
+    predicted, then one 'monthly_summary' message per site once the input
+    ends. Only the current chunk and the monthly aggregates are held in
+    memory, however long the input is. A failure ends the stream with an
+    'error' message, since the status code has already been sent.
+    """
+    sites = {}
+    try:
+        for site, day in items:
+            state = sites.get(site)
+            if state is None:
+                state = sites[site] = SiteStream(site, pipeline)
+            state.pending.append(day)
+            if len(state.pending) >= chunk_days:
+                yield state.flush()
+
+        for state in sites.values():
+            if state.pending:
+                yield state.flush()
+            yield {
+                'type': 'monthly_summary',
+                'site': state.site,
+                'monthly_summary': pipeline.summarize(state.aggregator)
+            }
+
+    except Exception as e:
+        yield {
+            'type': 'error',
+            'message': str(e)
+        }
@@ -0,0 +1,144 @@
+import logging
+import numpy as np
+from Common.forest import CompiledForest
+
+logger = logging.getLogger(__name__)
+
+
+# Lookup-table surrogate for forests with one categorical and one scalar feature
+class LookupTable:
+    """
+    Precomputed predictions of a RandomForestRegressor (or its CompiledForest)
+    whose input is [encoded category, scalar] scaled by a StandardScaler.
+
+    A forest is piecewise constant in every feature: for a fixed category its
+    prediction only changes where the scalar crosses one of the forest's split
+    thresholds. The table stores one prediction per category and per interval
+    between consecutive thresholds, so a query is a searchsorted plus an array
+    index and reproduces model.predict exactly. Rows whose category has no
+    table (e.g. the -1 placeholder for unseen types) or whose scalar is not
+    finite are answered by the real forest.
+    """
+
+    def __init__(self, model, scaler, category_codes, category_feature=0, scalar_feature=1):
+        self.model = model
+        self.category_feature = category_feature
+        self.scalar_feature = scalar_feature
+        self.mean = np.asarray(scaler.mean_, dtype=float)
+        self.scale = np.asarray(scaler.scale_, dtype=float)
+        self.n_features = len(self.mean)
+        self.thresholds = self._scalar_thresholds()
+        self.representatives = self._interval_representatives()
+
+        self.tables = {}
+        for code in category_codes:
+            rows = np.zeros((len(self.representatives), self.n_features))
+            rows[:, category_feature] = self._scale(code, category_feature)
+            rows[:, scalar_feature] = self.representatives
+            self.tables[int(code)] = np.asarray(model.predict(rows))
+
+    def _scale(self, values, feature):
+        # Same arithmetic as StandardScaler.transform for a single column
+        return (np.asarray(values, dtype=float) - self.mean[feature]) / self.scale[feature]
+
+    def _scalar_thresholds(self):
+        if isinstance(self.model, CompiledForest):
+            return np.unique(self.model.split_thresholds(self.scalar_feature))
+
+        thresholds = []
+        for estimator in self.model.estimators_:
+            tree = estimator.tree_
+            thresholds.append(tree.threshold[tree.feature == self.scalar_feature])
+        return np.unique(np.concatenate(thresholds)) if thresholds else np.empty(0)
+
+    def _interval_representatives(self):
+        """
+        One float32 point inside each interval (t[k-1], t[k]] plus one above the
+        last threshold. Trees compare float32 inputs with `x <= threshold`.
+        """
+        if len(self.thresholds) == 0:
+            return np.zeros(1, dtype=np.float32)
+
+        upper = self.thresholds.astype(np.float32)
+        too_high = upper.astype(float) > self.thresholds
+        upper[too_high] = np.nextafter(upper[too_high], np.float32(-np.inf))
+
+        last = np.float32(self.thresholds[-1])
+        if float(last) <= self.thresholds[-1]:
+            last = np.nextafter(last, np.float32(np.inf))
+        return np.append(upper, last)
+
+    def predict(self, codes, amounts):
+        """
+        Look up predictions for raw (unscaled) category codes and amounts.
+        Returns (predictions, covered) where covered marks the rows answered
+        from the table; uncovered rows are left as NaN.
+        """
+        codes = np.asarray(codes)
+        scaled = self._scale(amounts, self.scalar_feature).astype(np.float32)
+        sample = next(iter(self.tables.values()))
+        predictions = np.full((len(codes),) + sample.shape[1:], np.nan)
+        covered = np.zeros(len(codes), dtype=bool)
+
+        for code, table in self.tables.items():
+            rows = np.flatnonzero((codes == code) & np.isfinite(scaled))
+            if len(rows):
+                predictions[rows] = table[np.searchsorted(self.thresholds, scaled[rows], side='left')]
+                covered[rows] = True
+
+        return predictions, covered
+
+    def predict_with_fallback(self, codes, amounts, fallback):
+        """
+        Table lookup with the real forest answering the uncovered rows.
+        fallback(codes, amounts) must return model predictions for those rows.
+        """
+        codes = np.asarray(codes)
+        amounts = np.asarray(amounts, dtype=float)
+        predictions, covered = self.predict(codes, amounts)
+        if not covered.all():
+            missing = ~covered
+            predictions[missing] = fallback(codes[missing], amounts[missing])
+        return predictions
+
+    def error_report(self, n_samples=2000, seed=0):
+        """
+        Compare the table against model.predict on random amounts drawn from the
+        scaler's observed distribution (mean +/- 4 std) plus every interval edge.
+        """
+        rng = np.random.default_rng(seed)
+        spread = 4 * self.scale[self.scalar_feature]
+        centre = self.mean[self.scalar_feature]
+        amounts = np.concatenate([
+            rng.uniform(centre - spread, centre + spread, n_samples),
+            self.representatives.astype(float) * self.scale[self.scalar_feature] + centre
+        ])
+
+        max_error = 0.0
+        for code in self.tables:
+            codes = np.full(len(amounts), code)
+            predicted, _ = self.predict(codes, amounts)
+            rows = np.zeros((len(amounts), self.n_features))
+            rows[:, self.category_feature] = self._scale(codes, self.category_feature)
+            rows[:, self.scalar_feature] = self._scale(amounts, self.scalar_feature)
+            expected = np.asarray(self.model.predict(rows))
+            max_error = max(max_error, float(np.max(np.abs(predicted - expected))))
+
+        return {
+            'categories': len(self.tables),
+            'intervals': len(self.representatives),
+            'samples_per_category': len(amounts),
+            'max_abs_error': max_error
+        }
+
+
+def build_lookup_table(name, model, scaler, encoder):
+    """
+    Build the lookup table for every class known to the encoder and log its
+    measured error against the forest.
+    """
+    table = LookupTable(model, scaler, range(len(encoder.classes_)))
+    report = table.error_report()
+    logger.info("%s lookup table: %s", name, report)
+    table.report = report
+    return table
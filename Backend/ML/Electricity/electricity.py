@@ -1,156 +1,207 @@
 import numpy as np
-import pandas as pd
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.ensemble import RandomForestRegressor
-from collections import defaultdict
 import joblib
 import os
 import logging
-import json
+from types import SimpleNamespace
+from Common.forest import build_predictor
+from Common.settings import UNSEEN_CATEGORY_POLICY
+from Common.encoding import CategoryEncoder
+from Common.preprocessing import FusedPreprocessor
+from Common.risk import risk_tables
+from Common.aggregation import MonthlyAggregator
+from Common.registry import register_model
+from Common.artifacts import load_forest
 
 
-le = LabelEncoder()
-scaler = StandardScaler()
-model = RandomForestRegressor()
-
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
-# Load the LabelEncoder and scaler from files
+# Paths to the LabelEncoder, scaler and model files
 base_dir = os.path.dirname(os.path.abspath(__file__))
 scaler_path = os.path.join(base_dir,  'scaler.pkl')
 label_encoder_path = os.path.join(base_dir, 'label_encoder.pkl')
 model_path = os.path.join(base_dir, 'random_forest_model.pkl')
 
-scaler = joblib.load(scaler_path)
-label_encoder = joblib.load(label_encoder_path)
-model = joblib.load(model_path)
+# Risk thresholds for predicted CO2 (Common/risk_thresholds.json)
+risk_table = risk_tables['electricity']
+
+
+# Function to load the LabelEncoder, scaler and model and build everything derived from them
+def load_artifacts():
+    scaler = joblib.load(scaler_path)
+    label_encoder = joblib.load(label_encoder_path)
+    model = load_forest(model_path)
+    # Dict-backed encoder; unseen state names are rejected by default
+    state_encoder = CategoryEncoder(label_encoder, 'state name', UNSEEN_CATEGORY_POLICY or 'reject')
+
+    return SimpleNamespace(
+        scaler=scaler,
+        label_encoder=label_encoder,
+        model=model,
+        state_encoder=state_encoder,
+        # Scaled [stateName, energyPerTime, responsibleArea, totalArea] rows without a DataFrame
+        preprocessor=FusedPreprocessor(scaler, state_encoder),
+        # Prediction callable for the forest (see build_predictor)
+        model_predict=build_predictor('electricity', model)
+    )
+
+# Function to send one dummy day through the whole prediction path
+def warm_up():
+    state_name = electricity_model.get().label_encoder.classes_[0]
+    day = {'energyPerTime': 1.0, 'responsibleArea': 1.0, 'totalArea': 1.0}
+    calculate_monthly_summary_and_format(predict_emissions_and_risk([day], state_name))
+
+# Artifacts are loaded on first use or by app.py's background loader
+electricity_model = register_model('electricity', load_artifacts, warm_up)
 
 
+# Numeric features, in training order after 'stateName'
+NUMERIC_COLUMNS = ['energyPerTime', 'responsibleArea', 'totalArea']
+
 # Function to preprocess the input data
-def preprocess_data(input_data):
+def preprocess_data(input_data, state_name=None):
     """
     Preprocess input data for predictions with 'stateName' as the first feature.
+    When state_name is given it is used for every day instead of each day's
+    'stateName'. The input dicts are left unchanged.
+    """
+    # Ensure required columns exist (in at least one day, like DataFrame columns)
+    required_columns = NUMERIC_COLUMNS if state_name is not None else ['stateName'] + NUMERIC_COLUMNS
+    missing_columns = [col for col in required_columns if not any(col in day for day in input_data)]
+    if missing_columns:
+        raise ValueError(f"Missing columns in input data: {missing_columns}")
+
+    # Read each column straight out of the dicts; days without a value get NaN
+    state_names = [state_name] * len(input_data) if state_name is not None else [day.get('stateName') for day in input_data]
+    columns = [[day.get(col, np.nan) for day in input_data] for col in NUMERIC_COLUMNS]
+
+    # Encode 'stateName' and scale all features in one pass
+    return electricity_model.get().preprocessor.transform(state_names, *columns)
+
+# Function to preprocess columnar input data
+def preprocess_columns(columns, state_name=None):
+    """
+    Preprocess columnar input: one array per field ('energyPerTime',
+    'responsibleArea', 'totalArea') plus an optional parallel 'state_name'
+    array, which takes precedence over the state_name argument.
+    Returns the scaled features and the state name of every entry.
     """
-    # Convert JSON data to DataFrame
-    input_df = pd.DataFrame(input_data)
-    
-    # Ensure required columns exist
-    required_columns = ['stateName', 'energyPerTime', 'responsibleArea', 'totalArea']
-    missing_columns = [col for col in required_columns if col not in input_df.columns]
+    missing_columns = [col for col in NUMERIC_COLUMNS if col not in columns]
     if missing_columns:
         raise ValueError(f"Missing columns in input data: {missing_columns}")
-    
-    # Reorder columns to match training order
-    input_df = input_df[required_columns]
 
-    # Encode 'stateName' using the LabelEncoder
-    input_df['stateName'] = label_encoder.transform(input_df['stateName'])
+    numeric = [np.asarray(columns[col], dtype=float) for col in NUMERIC_COLUMNS]
+    if any(column.ndim != 1 for column in numeric):
+        raise ValueError('Columnar days_data fields must be flat arrays of the same length.')
+    if 'state_name' in columns:
+        if not isinstance(columns['state_name'], (list, tuple)):
+            raise ValueError('Columnar state_name must be an array of state names.')
+        state_names = list(columns['state_name'])
+    elif state_name is not None:
+        state_names = [state_name] * len(numeric[0])
+    else:
+        raise ValueError('Missing state_name: pass it with the request or as a state_name column.')
+
+    if len({len(state_names)} | {len(column) for column in numeric}) != 1:
+        raise ValueError('Columnar days_data fields must be flat arrays of the same length.')
 
-    # Scale the features using the previously fitted scaler
-    input_scaled = scaler.transform(input_df)
-    
-    return input_scaled
+    return electricity_model.get().preprocessor.transform(state_names, *numeric), state_names
 
 # Function to predict emissions and evaluate risk
-def predict_emissions_and_risk(days_data, state_name):
+def predict_emissions_and_risk(days_data, state_name=None, start_day=1):
     """
     Predict CO2 emissions and evaluate risk for the provided data.
 
     Args:
-        days_data (list of dict): List of dictionaries with daily data.
+        days_data (list of dict or dict of lists): List of dictionaries with daily
+            data, or the same fields as parallel arrays (see preprocess_columns).
         state_name (str): The state name.
+        start_day (int): Entry number of the first day (for inputs processed in chunks).
 
     Returns:
-        list of dict: Predictions with risk levels.
+        list of dict: Predictions with risk levels. When columnar input carries
+        a state_name array, every entry also has its "state_name" and entries
+        are numbered within their state. All states share one model.predict.
     """
-    # Add the state name to each day's data
-    for day in days_data:
-        day['stateName'] = state_name
-    
-    # Preprocess the input data
-    input_scaled = preprocess_data(days_data)
+    per_state = isinstance(days_data, dict) and 'state_name' in days_data
+    if isinstance(days_data, dict):
+        input_scaled, state_names = preprocess_columns(days_data, state_name)
+    else:
+        # Preprocess the input data with the state name for every day
+        input_scaled = preprocess_data(days_data, state_name)
 
     # Predict CO2 emissions
-    predictions = model.predict(input_scaled)
+    predictions = electricity_model.get().model_predict(input_scaled)
+
+    # Assess risk for all predictions at once
+    risk_levels = risk_table.label(predictions).tolist()
 
     # Create a response with risk levels
     response = []
-    for i, predicted_co2 in enumerate(predictions):
-        risk_level, predicted_value = assess_risk(predicted_co2)
+    if not per_state:
+        for i, (predicted_co2, risk_level) in enumerate(zip(predictions, risk_levels)):
+            response.append({
+                "Entry No ": i + start_day,
+                "predicted_co2": predicted_co2,
+                "risk_level": risk_level
+            })
+        return response
+
+    # Number the entries of each state separately
+    next_entry = {}
+    for state, predicted_co2, risk_level in zip(state_names, predictions, risk_levels):
+        entry_no = next_entry.get(state, start_day)
+        next_entry[state] = entry_no + 1
         response.append({
-            "Entry No ": i + 1,
-            "predicted_co2": predicted_value,
+            "state_name": state,
+            "Entry No ": entry_no,
+            "predicted_co2": predicted_co2,
             "risk_level": risk_level
         })
 
     return response
 
-# Function to assess risk based on CO2 levels
-def assess_risk(predicted_co2):
+def group_by_state(predictions):
     """
-    Assess risk level based on CO2 levels.
+    Split the entries of a multi-state prediction by state, in order of first appearance.
     """
-    if predicted_co2 < 300:
-        return "Low Risk", predicted_co2
-    elif predicted_co2 < 700:
-        return "Moderate Risk", predicted_co2
-    elif predicted_co2 < 1200:
-        return "High Risk", predicted_co2
-    else:
-        return "Severe Risk", predicted_co2
-
-def calculate_monthly_summary_and_format(daily_predictions):
-    
-
-        monthly_emissions = defaultdict(lambda: defaultdict(list))
-        monthly_risk_summary = defaultdict(lambda: defaultdict(int))
-        formatted_output = []
-
-        months = {
-            "January": range(1, 32),
-            "February": range(32, 60),
-            "March": range(60, 91),
-            "April": range(91, 121),
-            "May": range(121, 152),
-            "June": range(152, 182),
-            "July": range(182, 213),
-            "August": range(213, 244),
-            "September": range(244, 274),
-            "October": range(274, 305),
-            "November": range(305, 335),
-            "December": range(335, 366)
+    groups = {}
+    for prediction in predictions:
+        groups.setdefault(prediction['state_name'], []).append(prediction)
+    return groups
+
+def monthly_records(daily_predictions):
+    """
+    Yield (day, emissions, risks, category) for every prediction; the entry
+    number is the day of the year. Accepts any iterable of prediction entries.
+    """
+    for prediction in daily_predictions:
+        yield (prediction['Entry No '],
+               (prediction['predicted_co2'],),
+               ((None, prediction['risk_level']),),
+               None)
+
+# Function to create an empty monthly aggregator for electricity records
+def monthly_aggregator(year=None):
+    return MonthlyAggregator(['emissions'], year)
+
+def calculate_monthly_summary_and_format(daily_predictions, year=None):
+    return format_monthly_summary(monthly_aggregator(year).consume(monthly_records(daily_predictions)))
+
+def format_monthly_summary(aggregator):
+    formatted_output = []
+
+    for month, state in aggregator.summaries():
+        month_summary = {
+            "Month": month,
+            "Average Emissions": state.means()['emissions'],
+            "Risk Levels": {}
         }
 
-        for prediction in daily_predictions:
-            entry_number = prediction['Entry No ']
-            month = None
-            for m, entry_range in months.items():
-                if entry_number in entry_range:
-                    month = m
-                    break
-
-            if month:
-                monthly_emissions[month]['emissions'].append(prediction['predicted_co2'])
-                monthly_risk_summary[month][prediction['risk_level']] += 1
-
-        for month in months:
-            if monthly_emissions[month]['emissions']:
-                avg_emissions = sum(monthly_emissions[month]['emissions']) / len(monthly_emissions[month]['emissions'])
-            else:
-                avg_emissions = 0
-
-            month_summary = {
-                "Month": month,
-                "Average Emissions": avg_emissions,
-                "Risk Levels": {}
-            }
-
-            risk_counts = monthly_risk_summary[month]
-            total_risks = sum(risk_counts.values())
-            for risk_level, count in risk_counts.items():
-                month_summary["Risk Levels"][risk_level] = f"{(count / total_risks) * 100:.2f}%"
-
-            formatted_output.append(month_summary)
-
-        return formatted_output
+        total_risks = sum(state.risk_counts.values())
+        for (_, risk_level), count in state.risk_counts.items():
+            month_summary["Risk Levels"][risk_level] = f"{(count / total_risks) * 100:.2f}%"
+
+        formatted_output.append(month_summary)
+
+    return formatted_output
@@ -1,76 +1,66 @@
 # Import necessary libraries
-import pandas as pd
-import numpy as np
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score
 import joblib
 import os
-from collections import defaultdict
-import json
-from flask import Flask, request, jsonify
+from types import SimpleNamespace
+from Common.settings import INFERENCE_MODE, UNSEEN_CATEGORY_POLICY
+from Common.encoding import CategoryEncoder
+from Common.preprocessing import FusedPreprocessor
+from Common.surrogate import build_lookup_table
+from Common.forest import build_predictor
+from Common.risk import risk_tables
+from Common.aggregation import MonthlyAggregator
+from Common.registry import register_model
+from Common.artifacts import load_forest
 
-app = Flask(__name__)
-
-# Initialize the LabelEncoder instance
-le = LabelEncoder()
-scaler = StandardScaler()
-model = RandomForestRegressor()
 # Set the base directory and paths to the model, label encoder, and scaler
 base_dir = os.path.dirname(os.path.abspath(__file__))
 scaler_path = os.path.join(base_dir, 'scaler.pkl')
 label_encoder_path = os.path.join(base_dir, 'label_encoder.pkl')
 model_path = os.path.join(base_dir, 'random_forest_model.pkl')
 
-# Load the LabelEncoder from the file
-le = joblib.load(label_encoder_path)
-scaler = joblib.load(scaler_path)
-model = joblib.load(model_path)
-# Now, 'le' is correctly loaded as an instance of LabelEncoder
-
-# Function to handle unseen explosive types
-def safe_transform(encoder, value):
-    # Ensure the value is a string before transforming
-    if not isinstance(value, str):
-        print(f"Warning: '{value}' is not a string, returning placeholder value!")
-        return -1  # Return a placeholder value if the input is not a string
-
-    try:
-        # Try transforming the value
-        return encoder.transform([value])[0]
-    except ValueError:
-        # If the value is not recognized by the encoder, return a placeholder value
-        print(f"Warning: '{value}' is an unseen category! Returning placeholder value.")
-        return -1  # Assign a placeholder value for unseen types
-
-# Risk evaluation thresholds
-def risk_evaluation(row):
-    thresholds = {
-        'CO': [400, 700, 1000],
-        'NOx': [20, 40, 60],
-        'NH3': [50, 80, 120],
-        'HCN': [20, 50, 80],
-        'H2S': [20, 50, 80],
-        'SO2': [1, 5, 10],
-        'CO2': [1000, 5000, 10000]
-    }
-
-    risks = {}
-    for gas, levels in thresholds.items():
-        value = row.get(gas, 0)  # Safely get the value for the gas, default to 0 if not present
-        if value > levels[2]:
-            risks[gas] = "Severe"
-        elif value > levels[1]:
-            risks[gas] = "High"
-        elif value > levels[0]:
-            risks[gas] = "Moderate"
-        else:
-            risks[gas] = "Low"
-    return risks
+# Function to load the LabelEncoder, scaler and model and build everything derived from them
+def load_artifacts():
+    le = joblib.load(label_encoder_path)
+    scaler = joblib.load(scaler_path)
+    model = load_forest(model_path)
+    # Dict-backed encoder; unseen explosive types get the -1 placeholder by default
+    explosive_encoder = CategoryEncoder(le, 'explosiveType', UNSEEN_CATEGORY_POLICY or 'placeholder')
+
+    return SimpleNamespace(
+        le=le,
+        scaler=scaler,
+        model=model,
+        explosive_encoder=explosive_encoder,
+        # Scaled [explosiveType, amount] rows straight from arrays, without a DataFrame
+        preprocessor=FusedPreprocessor(scaler, explosive_encoder),
+        # Prediction callable for the forest (see build_predictor)
+        model_predict=build_predictor('explosive', model),
+        # Optional lookup-table surrogate for the forest (ML_INFERENCE_MODE=table)
+        lookup_table=build_lookup_table('explosive', model, scaler, le) if INFERENCE_MODE == 'table' else None
+    )
+
+# Function to send one dummy explosive through the whole prediction path
+def warm_up():
+    explosive_type = explosive_model.get().le.classes_[0]
+    calculate_monthly_summary_and_format(predict_7_days_multiple_explosives([[[explosive_type, 1.0]]]))
+
+# Artifacts are loaded on first use or by app.py's background loader
+explosive_model = register_model('explosive', load_artifacts, warm_up)
+
+# Predicted gas columns, in model output order
+EMISSION_COLUMNS = ['CO', 'NOx', 'NH3', 'HCN', 'H2S', 'SO2', 'CO2']
+
+# Risk thresholds per gas (Common/risk_thresholds.json)
+risk_table = risk_tables['explosive']
+
+# Function to scale encoded explosive rows and run them through the forest
+def predict_encoded(explosive_codes, amounts):
+    artifacts = explosive_model.get()
+    input_scaled = artifacts.preprocessor.transform_codes(explosive_codes, amounts)
+    return artifacts.model_predict(input_scaled)
 
 # Function to predict emissions and evaluate risks for multiple explosives per day
-def predict_7_days_multiple_explosives(input_data):
+def predict_7_days_multiple_explosives(input_data, start_day=1):
     """
     Predict emissions and evaluate risks for each day over 7 days, where each day can contain one or more explosive types.
 
@@ -78,114 +68,81 @@ def predict_7_days_multiple_explosives(input_data):
     input_data (list of lists): List containing explosive types and amounts for each day.
                                 E.g., [['TNT', 3000], ['Dynamite', 2000], ...]
 
+    start_day (int): Day number of the first entry (for inputs processed in chunks).
+
     Returns:
     dict: Dictionary with predictions for each day.
     """
-    all_predictions = {}
-
-    # Loop through each day in the input data (days can have multiple explosives)
-    for day, explosives in enumerate(input_data, start=1):
-        daily_predictions = []
-
+    # Flatten every (day, explosive) pair so the whole request is scored in one pass
+    day_numbers = []
+    rows = []
+    for day, explosives in enumerate(input_data, start=start_day):
         for explosive_type, amount in explosives:
-            # Prepare a DataFrame for the explosive
-            input_df = pd.DataFrame([[explosive_type, amount]], columns=['explosiveType', 'amount'])
-
-            # Encode explosive type
-            input_df['explosiveType'] = input_df['explosiveType'].apply(lambda x: safe_transform(le, x))
-
-            # Scale the input data
-            input_df_scaled = scaler.transform(input_df)
-
-            # Predict emissions for this explosive type
-            predicted_emissions = model.predict(input_df_scaled)
-
-            # Create a DataFrame for the predictions
-            predicted_df = pd.DataFrame(predicted_emissions, columns=['CO', 'NOx', 'NH3', 'HCN', 'H2S', 'SO2', 'CO2'])
-
-            # Add the explosive type as a new column
-            predicted_df['Explosive Type'] = explosive_type
+            day_numbers.append(day)
+            rows.append([explosive_type, amount])
+
+    all_predictions = {f"Day {day}": [] for day in range(start_day, start_day + len(input_data))}
+    if not rows:
+        return all_predictions
+
+    # Encode explosive types and predict the whole batch at once
+    artifacts = explosive_model.get()
+    explosive_codes = artifacts.explosive_encoder.encode([row[0] for row in rows])
+    amounts = [row[1] for row in rows]
+    if artifacts.lookup_table is not None:
+        predicted_emissions = artifacts.lookup_table.predict_with_fallback(explosive_codes, amounts, predict_encoded)
+    else:
+        predicted_emissions = predict_encoded(explosive_codes, amounts)
+    risk_evaluations = risk_table.label_records(predicted_emissions)
+
+    # Split the batch back into the per-day response shape
+    for day, row, emissions, risks in zip(day_numbers, rows, predicted_emissions.tolist(), risk_evaluations):
+        record = {'Explosive Type': row[0], 'Risk Evaluation': risks}
+        record.update(zip(EMISSION_COLUMNS, emissions))
+        all_predictions[f"Day {day}"].append([record])
 
-            # Add risk evaluations
-            predicted_df['Risk Evaluation'] = predicted_df.apply(risk_evaluation, axis=1)
-
-            ordered_columns = ['Explosive Type', 'Risk Evaluation', 'CO', 'NOx', 'NH3', 'HCN', 'H2S', 'SO2', 'CO2']
-            ordered_df = predicted_df[ordered_columns]
+    return all_predictions
 
-            # Convert the DataFrame to a dictionary with the correct column order
-            daily_predictions.append(ordered_df.to_dict(orient='records'))
+# Function to flatten predictions into records for the monthly aggregator
+def monthly_records(all_predictions):
+    """
+    Yield (day, emissions, risks, explosive type) for every predicted explosive.
+    Accepts the dict returned by predict_7_days_multiple_explosives or any
+    iterable of ("Day N", day_data) pairs.
+    """
+    day_items = all_predictions.items() if isinstance(all_predictions, dict) else all_predictions
+    for day, day_data in day_items:
+        day_number = int(day.split()[1])
+        for explosive_group in day_data:
+            for explosive in explosive_group:
+                yield (day_number,
+                       [explosive[gas] for gas in EMISSION_COLUMNS],
+                       explosive["Risk Evaluation"].items(),
+                       explosive["Explosive Type"])
 
-        # Store the predictions for the day
-        all_predictions[f"Day {day}"] = daily_predictions
+# Function to create an empty monthly aggregator for explosive records
+def monthly_aggregator(year=None):
+    return MonthlyAggregator(EMISSION_COLUMNS, year)
 
-    return all_predictions
+def calculate_monthly_summary_and_format(all_predictions, year=None):
+    return format_monthly_summary(monthly_aggregator(year).consume(monthly_records(all_predictions)))
 
-def calculate_monthly_summary_and_format(all_predictions):
-    # Initialize structures for monthly aggregation
-    monthly_emissions = defaultdict(lambda: defaultdict(list))
-    monthly_risk_summary = defaultdict(lambda: defaultdict(int))
-    explosive_types = defaultdict(set)
+def format_monthly_summary(aggregator):
     formatted_output = []
 
-    # Define the months and their corresponding day ranges
-    months = {
-        "January": range(1, 31),
-        "February": range(31, 60),
-        "March": range(61, 91),
-        "April": range(91, 121),
-        "May": range(121, 151),
-        "June": range(151, 181),
-        "July": range(181, 212),
-        "August": range(212, 243),
-        "September": range(243, 273),
-        "October": range(273, 304),
-        "November": range(304, 334),
-        "December": range(334, 365)
-    }
-
-    # Process each day's data
-    for day, day_data in all_predictions.items():
-        day_number = int(day.split()[1])
-        month = None
-        for m, day_range in months.items():
-            if day_number in day_range:
-                month = m
-                break
-
-        if month:
-            for explosive_group in day_data:
-                for explosive in explosive_group:
-                    # Aggregate monthly emissions
-                    for gas in ["CO", "NOx", "NH3", "HCN", "H2S", "SO2", "CO2"]:
-                        monthly_emissions[month][gas].append(explosive[gas])
-
-                    # Count risk levels for monthly risk summary
-                    for gas, risk_level in explosive["Risk Evaluation"].items():
-                        monthly_risk_summary[month][f"{gas} - {risk_level}"] += 1
-
-                    # Collect explosive types
-                    explosive_types[month].add(explosive["Explosive Type"])
-
-    # Calculate monthly averages for emissions
-    for month in months:
+    for month, state in aggregator.summaries():
         month_summary = {
             "Month": month,
-            "Explosive Type": list(explosive_types[month]),
-            "Emissions": {gas: 0 for gas in ["CO", "NOx", "NH3", "HCN", "H2S", "SO2", "CO2"]},
+            "Explosive Type": list(state.categories),
+            "Emissions": state.means(),
             "Risk Evaluation": {}
         }
 
-        # Calculate average emissions for the month
-        for gas, values in monthly_emissions[month].items():
-            month_summary["Emissions"][gas] = sum(values) / len(values) if values else 0
-
         # Summarize risk levels for the month
-        risk_counts = monthly_risk_summary[month]
-        total_risks = sum(risk_counts.values())
-        for risk, count in risk_counts.items():
-            gas, risk_level = risk.split(" - ")
+        total_risks = sum(state.risk_counts.values())
+        for (gas, risk_level), count in state.risk_counts.items():
             month_summary["Risk Evaluation"][gas] = f"{risk_level} - {(count / total_risks) * 100:.2f}%"
 
         formatted_output.append(month_summary)
 
-    return formatted_output
\ No newline at end of file
+    return formatted_output
@@ -1,102 +1,117 @@
-import pandas as pd
 import numpy as np
 import joblib
-import json
 import os
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
+from types import SimpleNamespace
 from collections import defaultdict
-
-label_encoder = LabelEncoder()
-scaler = StandardScaler()
-model = RandomForestRegressor()
-
-# Load the LabelEncoder and scaler from files
+from Common.settings import INFERENCE_MODE, UNSEEN_CATEGORY_POLICY
+from Common.encoding import CategoryEncoder
+from Common.preprocessing import FusedPreprocessor
+from Common.surrogate import build_lookup_table
+from Common.forest import build_predictor
+from Common.risk import risk_tables
+from Common.aggregation import MonthlyAggregator
+from Common.registry import register_model
+from Common.artifacts import load_forest
+
+# Paths to the model, scaler and LabelEncoder files
 base_dir = os.path.dirname(os.path.abspath(__file__))
 scaler_path = os.path.join(base_dir, 'fuel_scaler.pkl')
 label_encoder_path = os.path.join(base_dir, 'fuel_label_encoder.pkl')
 model_path = os.path.join(base_dir, 'fuel_model.pkl')
 
-model = joblib.load(model_path)
-scaler = joblib.load(scaler_path)
-label_encoder = joblib.load(label_encoder_path)
-
-# Risk level function
-def assign_risk(value, emission_type):
-    thresholds = {
-        'CO2 (kg)': [2000, 9000, 15000],
-        'Nitrous Oxide CO2e (kg)': [200, 500, 1000],
-        'Methane CO2e (kg)': [30, 100, 200],
-        'Total Direct CO2e (kg)': [2000, 9000, 15000],
-        'Indirect CO2e (kg)': [500, 1000, 1500],
-        'Life Cycle CO2e (kg)': [10000, 15000, 20000]
-    }
-
-    if emission_type in thresholds:
-        if value < thresholds[emission_type][0]:
-            return "Low Risk"
-        elif value < thresholds[emission_type][1]:
-            return "Moderate Risk"
-        elif value < thresholds[emission_type][2]:
-            return "High Risk"
-        else:
-            return "Severe Risk"
-    return "Unknown"
+# Load the model, scaler and LabelEncoder and build everything derived from them
+def load_artifacts():
+    model = load_forest(model_path)
+    scaler = joblib.load(scaler_path)
+    label_encoder = joblib.load(label_encoder_path)
+    # Dict-backed encoder; unseen fuel types are rejected by default
+    fuel_encoder = CategoryEncoder(label_encoder, 'fuel type', UNSEEN_CATEGORY_POLICY or 'reject')
+
+    return SimpleNamespace(
+        model=model,
+        scaler=scaler,
+        label_encoder=label_encoder,
+        fuel_encoder=fuel_encoder,
+        # Scaled [fuel, volume] rows straight from arrays, without a DataFrame
+        preprocessor=FusedPreprocessor(scaler, fuel_encoder),
+        # Prediction callable for the forest (see build_predictor)
+        model_predict=build_predictor('fuel', model),
+        # Optional lookup-table surrogate for the forest (ML_INFERENCE_MODE=table)
+        lookup_table=build_lookup_table('fuel', model, scaler, label_encoder) if INFERENCE_MODE == 'table' else None
+    )
+
+# Send one dummy fuel entry through the whole prediction path
+def warm_up():
+    fuel_type = fuel_model.get().label_encoder.classes_[0]
+    calculate_monthly_summary_and_format(predict_emissions_and_risk([[(fuel_type, 1.0)]]))
+
+# Artifacts are loaded on first use or by app.py's background loader
+fuel_model = register_model('fuel', load_artifacts, warm_up)
+
+# Predicted emission types, in model output order
+EMISSION_TYPES = ["CO2 (kg)", "Nitrous Oxide CO2e (kg)", "Methane CO2e (kg)", "Total Direct CO2e (kg)", "Indirect CO2e (kg)", "Life Cycle CO2e (kg)"]
+
+# Risk thresholds per emission type (Common/risk_thresholds.json)
+risk_table = risk_tables['fuel']
+
+# Scale encoded fuel rows and run them through the forest
+def predict_encoded(fuel_encoded, volumes):
+    artifacts = fuel_model.get()
+    input_scaled = artifacts.preprocessor.transform_codes(fuel_encoded, volumes)
+    return artifacts.model_predict(input_scaled)
 
 # Predict emissions and risk
-def predict_emissions_and_risk(daily_fuel_data):
+def predict_emissions_and_risk(daily_fuel_data, start_day=1):
     """
     Predict emissions and risk levels for 7 days of fuel data.
     Args:
         daily_fuel_data (list): A list of 7 days, each containing tuples of fuel type and volume.
+        start_day (int): Day number of the first entry (for inputs processed in chunks).
     Returns:
         dict: JSON-formatted predictions with risk levels.
     """
+    # Flatten all days so the whole request is encoded and predicted at once
+    entries = [(day_index, fuel_type, volume)
+               for day_index, fuels in enumerate(daily_fuel_data, start=start_day)
+               for fuel_type, volume in fuels]
     results = []
+    if not entries:
+        return {"status": "success", "predictions": results}
+
+    artifacts = fuel_model.get()
+    fuel_encoded = artifacts.fuel_encoder.encode([fuel_type for _, fuel_type, _ in entries])
+    volumes = np.asarray([volume for _, _, volume in entries], dtype=float)
+
+    # Predict emissions
+    if artifacts.lookup_table is not None:
+        predictions = artifacts.lookup_table.predict_with_fallback(fuel_encoded, volumes, predict_encoded)
+    else:
+        predictions = predict_encoded(fuel_encoded, volumes)
+
+    # Classify every emission of every row at once
+    risk_levels_per_row = risk_table.label_records(predictions)
+
+    for (day_index, fuel_type, volume), prediction, risk_levels in zip(entries, predictions, risk_levels_per_row):
+        # Create result for this fuel, rounding the emission values to 3 decimal places
+        fuel_result = {
+            "fuel_type": fuel_type,
+            "quantity_fuel_consumed_liters": volume,
+            "emissions": {
+                "CO2 (kg)": round(prediction[0], 3),
+                "Nitrous Oxide CO2e (kg)": round(prediction[1], 3),
+                "Methane CO2e (kg)": round(prediction[2], 3),
+                "Total Direct CO2e (kg)": round(prediction[3], 3),
+                "Indirect CO2e (kg)": round(prediction[4], 3),
+                "Life Cycle CO2e (kg)": round(prediction[5], 3)
+            },
+            "risk_levels": risk_levels
+        }
 
-    for day_index, fuels in enumerate(daily_fuel_data, start=1):
-        for fuel_type, volume in fuels:
-            # Encode fuel type and prepare data
-            fuel_encoded = label_encoder.transform([fuel_type])[0]
-            input_features = np.array([[fuel_encoded, volume]])  # numpy array
-
-            # Convert input to DataFrame with the feature names used during training
-            input_df = pd.DataFrame(input_features, columns=["Fuel", "Quantity Fuel Consumed (liters)"])
-
-            # Scale the input features
-            input_scaled = scaler.transform(input_df)
-
-            # Predict emissions
-            prediction = model.predict(input_scaled)[0]
-
-            # Create result for this fuel, rounding the emission values to 3 decimal places
-            fuel_result = {
-                "fuel_type": fuel_type,
-                "quantity_fuel_consumed_liters": volume,
-                "emissions": {
-                    "CO2 (kg)": round(prediction[0], 3),
-                    "Nitrous Oxide CO2e (kg)": round(prediction[1], 3),
-                    "Methane CO2e (kg)": round(prediction[2], 3),
-                    "Total Direct CO2e (kg)": round(prediction[3], 3),
-                    "Indirect CO2e (kg)": round(prediction[4], 3),
-                    "Life Cycle CO2e (kg)": round(prediction[5], 3)
-                },
-                "risk_levels": {
-                    "CO2 (kg)": assign_risk(prediction[0], "CO2 (kg)"),
-                    "Nitrous Oxide CO2e (kg)": assign_risk(prediction[1], "Nitrous Oxide CO2e (kg)"),
-                    "Methane CO2e (kg)": assign_risk(prediction[2], "Methane CO2e (kg)"),
-                    "Total Direct CO2e (kg)": assign_risk(prediction[3], "Total Direct CO2e (kg)"),
-                    "Indirect CO2e (kg)": assign_risk(prediction[4], "Indirect CO2e (kg)"),
-                    "Life Cycle CO2e (kg)": assign_risk(prediction[5], "Life Cycle CO2e (kg)")
-                }
-            }
-
-            # Append the result for this fuel to the daily predictions
-            results.append({
-                "day": day_index,
-                "fuel_data": fuel_result
-            })
+        # Append the result for this fuel to the daily predictions
+        results.append({
+            "day": day_index,
+            "fuel_data": fuel_result
+        })
 
     # Return the formatted JSON response with the "status" and "predictions" keys
     response = {
@@ -105,72 +120,47 @@ def predict_emissions_and_risk(daily_fuel_data):
     }
 
     return response
-def calculate_monthly_summary_and_format(daily_predictions):
-    # Initialize structures for monthly aggregation
-    monthly_emissions = defaultdict(lambda: defaultdict(list))
-    monthly_risk_summary = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
-    fuel_types = defaultdict(set)
+# Flatten predictions into records for the monthly aggregator
+def monthly_records(daily_predictions):
+    """
+    Yield (day, emissions, risks, fuel type) for every predicted fuel entry.
+    Accepts the response of predict_emissions_and_risk or any iterable of its
+    prediction entries.
+    """
+    predictions = daily_predictions['predictions'] if isinstance(daily_predictions, dict) else daily_predictions
+    for prediction in predictions:
+        fuel_data = prediction['fuel_data']
+        yield (prediction['day'],
+               [fuel_data['emissions'][emission_type] for emission_type in EMISSION_TYPES],
+               fuel_data['risk_levels'].items(),
+               fuel_data['fuel_type'])
+
+# Create an empty monthly aggregator for fuel records
+def monthly_aggregator(year=None):
+    return MonthlyAggregator(EMISSION_TYPES, year)
+
+def calculate_monthly_summary_and_format(daily_predictions, year=None):
+    return format_monthly_summary(monthly_aggregator(year).consume(monthly_records(daily_predictions)))
+
+def format_monthly_summary(aggregator):
     formatted_output = []
 
-    # Define the months and their corresponding day ranges
-    months = {
-        "January": range(1, 31),
-        "February": range(31, 60),
-        "March": range(61, 91),
-        "April": range(91, 121),
-        "May": range(121, 151),
-        "June": range(151, 181),
-        "July": range(181, 212),
-        "August": range(212, 243),
-        "September": range(243, 273),
-        "October": range(273, 304),
-        "November": range(304, 334),
-        "December": range(334, 365)
-    }
-
-    # Process each day's data
-    for prediction in daily_predictions['predictions']:
-        day_number = prediction['day']
-        month = None
-        for m, day_range in months.items():
-            if day_number in day_range:
-                month = m
-                break
-
-        if month:
-            fuel_data = prediction['fuel_data']
-            # Aggregate monthly emissions
-            for emission_type, value in fuel_data['emissions'].items():
-                monthly_emissions[month][emission_type].append(value)
-
-            # Count risk levels for monthly risk summary
-            for emission_type, risk_level in fuel_data['risk_levels'].items():
-                monthly_risk_summary[month][emission_type][risk_level] += 1
-
-            # Collect fuel types
-            fuel_types[month].add(fuel_data['fuel_type'])
-
-    # Calculate monthly averages for emissions
-    for month in months:
+    for month, state in aggregator.summaries():
         month_summary = {
             "Month": month,
-            "Fuel Types": list(fuel_types[month]),
-            "Emissions": {emission_type: 0 for emission_type in ["CO2 (kg)", "Nitrous Oxide CO2e (kg)", "Methane CO2e (kg)", "Total Direct CO2e (kg)", "Indirect CO2e (kg)", "Life Cycle CO2e (kg)"]},
+            "Fuel Types": list(state.categories),
+            "Emissions": state.means(),
             "Risk Levels": {}
         }
 
-        # Calculate average emissions for the month
-        for emission_type, values in monthly_emissions[month].items():
-            month_summary["Emissions"][emission_type] = sum(values) / len(values) if values else 0
-
-        # Summarize risk levels for the month
-        for emission_type, risk_levels in monthly_risk_summary[month].items():
-            total_risks = sum(risk_levels.values())
-            risk_summary = {}
-            for risk_level, count in risk_levels.items():
-                risk_summary[risk_level] = f"{risk_level} - {(count / total_risks) * 100:.2f}%"
-            month_summary["Risk Levels"][emission_type] = risk_summary
+        # Summarize risk levels per emission type for the month
+        totals = defaultdict(int)
+        for (emission_type, risk_level), count in state.risk_counts.items():
+            totals[emission_type] += count
+        for (emission_type, risk_level), count in state.risk_counts.items():
+            risk_summary = month_summary["Risk Levels"].setdefault(emission_type, {})
+            risk_summary[risk_level] = f"{risk_level} - {(count / totals[emission_type]) * 100:.2f}%"
 
         formatted_output.append(month_summary)
 
-    return formatted_output
\ No newline at end of file
+    return formatted_output
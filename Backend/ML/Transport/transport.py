@@ -1,13 +1,18 @@
-from flask import Flask, request, jsonify
 import pandas as pd
 import numpy as np
 import joblib
 import os
-from collections import defaultdict
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import mean_squared_error
+import logging
+from types import SimpleNamespace
+from Common.forest import build_predictor
+from Common.settings import UNSEEN_CATEGORY_POLICY
+from Common.encoding import CategoryEncoder
+from Common.risk import risk_tables
+from Common.aggregation import MonthlyAggregator
+from Common.registry import register_model
+from Common.artifacts import load_forest
+
+logger = logging.getLogger(__name__)
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -15,15 +20,35 @@ base_dir = os.path.dirname(os.path.abspath(__file__))
 model_path = os.path.join(base_dir, 'carbon_emission_model.pkl')
 label_encoder_path = os.path.join(base_dir, 'transport_label_encoder.pkl')
 
-# Load the model and label encoder
-try:
-    model = joblib.load(model_path)
-    transport_label_encoder = joblib.load(label_encoder_path)
-except FileNotFoundError as e:
-    print(f"Error: {e}")
-    print(f"Model path: {model_path}")
-    print(f"Label encoder path: {label_encoder_path}")
-    raise  # Re-raise the exception after logging the error
+def load_artifacts():
+    """
+    Load the model and label encoder and build everything derived from them.
+    """
+    try:
+        model = load_forest(model_path)
+        transport_label_encoder = joblib.load(label_encoder_path)
+    except FileNotFoundError as e:
+        logger.error("Error: %s (model path: %s, label encoder path: %s)", e, model_path, label_encoder_path)
+        raise  # Re-raise the exception after logging the error
+
+    return SimpleNamespace(
+        model=model,
+        transport_label_encoder=transport_label_encoder,
+        # Dict-backed encoder; unseen transport methods are rejected by default
+        transport_encoder=CategoryEncoder(transport_label_encoder, 'transport method', UNSEEN_CATEGORY_POLICY or 'reject'),
+        # Prediction callable for the forest (see build_predictor)
+        model_predict=build_predictor('transport', model)
+    )
+
+def warm_up():
+    """
+    Send one dummy shipment leg through the whole prediction path.
+    """
+    transport_method = transport_model.get().transport_label_encoder.classes_[0]
+    calculate_monthly_summary_and_format(predict_emissions_and_risk([[('kg', 1.0, 'km', 1.0, transport_method)]]))
+
+# Artifacts are loaded on first use or by app.py's background loader
+transport_model = register_model('transport', load_artifacts, warm_up)
 
 def preprocess_data(dataframe):
     """
@@ -33,7 +58,7 @@ def preprocess_data(dataframe):
     dataframe.columns = dataframe.columns.str.strip()  # Clean column names
 
     # Encode transport_method using LabelEncoder
-    dataframe['transport_method'] = transport_label_encoder.transform(dataframe['transport_method'])
+    dataframe['transport_method'] = transport_model.get().transport_label_encoder.transform(dataframe['transport_method'])
 
     # Extract numerical values from carbonEmissions
     dataframe['carbonEmissions'] = dataframe['carbonEmissions'].apply(
@@ -47,119 +72,117 @@ def split_data(dataframe):
     Function to split the data into features (X) and target (y),
     and create training and testing sets.
     """
+    from sklearn.model_selection import train_test_split  # Only needed for training
+
     X = dataframe[['weight_value', 'distance_value', 'transport_method']]
     y = dataframe['carbonEmissions']
     return train_test_split(X, y, test_size=0.2, random_state=42)
 
-def assess_risk(emission_value):
+# Conversion factors into the units the model expects (kilograms and kilometers)
+WEIGHT_UNIT_FACTORS = {'g': 0.001, 'kg': 1.0, 'lb': 0.45359237, 'mt': 1000.0}
+DISTANCE_UNIT_FACTORS = {'km': 1.0, 'mi': 1.609344}
+
+# Risk thresholds for predicted emissions (Common/risk_thresholds.json)
+risk_table = risk_tables['transport']
+
+def unit_factors(units, factors, kind):
     """
-    Function to determine the risk level based on the emission value.
+    Map an array of unit names to conversion factors, rejecting unknown units.
     """
-    if emission_value < 500:
-        return 'Low Risk'
-    elif emission_value < 2000:
-        return 'Moderate Risk'
-    elif emission_value < 5000:
-        return 'High Risk'
-    else:
-        return 'Severe Risk'
-
-def predict_emissions_and_risk(days_data):
+    names = np.asarray(units, dtype=str)
+    unique_names, inverse = np.unique(names, return_inverse=True)
+    unknown = [name for name in unique_names if name not in factors]
+    if unknown:
+        raise ValueError(f"Unsupported {kind} unit(s): {unknown}")
+    return np.array([factors[name] for name in unique_names])[inverse]
+
+def predict_emissions_and_risk(days_data, normalize_units=False, start_day=1):
     """
     Function to predict emissions and assess risk levels for a 7-day input.
-    Each day's predictions and risks are displayed.
-    """
-    results = []  # To store predictions and risks for all 7 days
-
-    for day, day_data in enumerate(days_data, start=1):
-        day_results = []  # Store results for one day
+    All entries of all days are scored with a single encoder pass and a single
+    model.predict call, then regrouped per day.
 
-        for entry in day_data:
-            # Extract features from the entry
-            weight_unit, weight_value, distance_unit, distance_value, transport_method = entry
-
-            # Convert transport_method to numeric
-            transport_method_encoded = transport_label_encoder.transform([transport_method])[0]
-
-            # Create a DataFrame with proper column names
-            features = pd.DataFrame([[weight_value, distance_value, transport_method_encoded]],
-                                    columns=['weight_value', 'distance_value', 'transport_method'])
-
-            # Predict emissions
-            predicted_emission = model.predict(features)[0]
+    When normalize_units is set, weights are converted to kilograms and
+    distances to kilometers before prediction. start_day numbers the first
+    day when a long input is processed in chunks.
+    """
+    day_lengths = np.array([len(day_data) for day_data in days_data], dtype=np.int64)
+    entries = [entry for day_data in days_data for entry in day_data]
+
+    if entries:
+        artifacts = transport_model.get()
+        weight_units, weight_values, distance_units, distance_values, transport_methods = zip(*entries)
+        weight_values = np.asarray(weight_values, dtype=float)
+        distance_values = np.asarray(distance_values, dtype=float)
+
+        if normalize_units:
+            weight_values = weight_values * unit_factors(weight_units, WEIGHT_UNIT_FACTORS, 'weight')
+            distance_values = distance_values * unit_factors(distance_units, DISTANCE_UNIT_FACTORS, 'distance')
+
+        # Convert every transport_method to numeric in one pass
+        transport_methods_encoded = artifacts.transport_encoder.encode(transport_methods)
+
+        features = pd.DataFrame({
+            'weight_value': weight_values,
+            'distance_value': distance_values,
+            'transport_method': transport_methods_encoded
+        })
+
+        # Predict emissions and assess risk for all entries at once
+        predicted_emissions = artifacts.model_predict(features).tolist()
+        risk_levels = risk_table.label(predicted_emissions).tolist()
+    else:
+        transport_methods, predicted_emissions, risk_levels = [], [], []
+
+    # Rebuild the per-day grouping from the day offsets
+    offsets = np.concatenate(([0], np.cumsum(day_lengths))).tolist()
+    results = []
+    for index in range(len(days_data)):
+        start, end = offsets[index], offsets[index + 1]
+        day_results = [
+            {'Trasport Method': transport_methods[i], 'Predicted Emission': predicted_emissions[i], 'Risk Level': risk_levels[i]}
+            for i in range(start, end)
+        ]
+        results.append({'Day': start_day + index, 'Results': day_results})
 
-            # Assess risk
-            risk_level = assess_risk(predicted_emission)
+    return results
 
-            # Store prediction and risk level
-            day_results.append({'Trasport Method':transport_method,'Predicted Emission': predicted_emission, 'Risk Level': risk_level})
+def monthly_records(daily_predictions):
+    """
+    Yield (day, emissions, risks, transport method) for every predicted leg.
+    Accepts the list returned by predict_emissions_and_risk or any iterable
+    of its per-day entries.
+    """
+    for prediction in daily_predictions:
+        for transport_data in prediction['Results']:
+            yield (prediction['Day'],
+                   (transport_data['Predicted Emission'],),
+                   ((None, transport_data['Risk Level']),),
+                   transport_data['Trasport Method'])
 
-        # Add day's results to the main results list
-        results.append({'Day': day, 'Results': day_results})
+def monthly_aggregator(year=None):
+    """
+    Create an empty monthly aggregator for transport records.
+    """
+    return MonthlyAggregator(['emissions'], year)
 
-    return results
+def calculate_monthly_summary_and_format(daily_predictions, year=None):
+    return format_monthly_summary(monthly_aggregator(year).consume(monthly_records(daily_predictions)))
 
-def calculate_monthly_summary_and_format(daily_predictions):
-    # Initialize structures for monthly aggregation
-    monthly_emissions = defaultdict(lambda: defaultdict(list))
-    monthly_risk_summary = defaultdict(lambda: defaultdict(int))
-    transport_methods = defaultdict(set)
+def format_monthly_summary(aggregator):
     formatted_output = []
 
-    # Define the months and their corresponding day ranges
-    months = {
-        "January": range(1, 32),
-        "February": range(32, 60),
-        "March": range(60, 91),
-        "April": range(91, 121),
-        "May": range(121, 152),
-        "June": range(152, 182),
-        "July": range(182, 213),
-        "August": range(213, 244),
-        "September": range(244, 274),
-        "October": range(274, 305),
-        "November": range(305, 335),
-        "December": range(335, 366)
-    }
-
-    # Process each day's data
-    for prediction in daily_predictions:
-        day_number = prediction['Day']
-        month = None
-        for m, day_range in months.items():
-            if day_number in day_range:
-                month = m
-                break
-
-        if month:
-            for transport_data in prediction['Results']:
-                # Aggregate monthly emissions
-                monthly_emissions[month]['emissions'].append(transport_data['Predicted Emission'])
-
-                # Count risk levels for monthly risk summary
-                monthly_risk_summary[month][transport_data['Risk Level']] += 1
-
-                # Collect transport methods
-                transport_methods[month].add(transport_data['Trasport Method'])
-
-    # Calculate monthly averages for emissions
-    for month in months:
-        if monthly_emissions[month]['emissions']:
-            avg_emissions = sum(monthly_emissions[month]['emissions']) / len(monthly_emissions[month]['emissions'])
-        else:
-            avg_emissions = 0
-
+    for month, state in aggregator.summaries():
         month_summary = {
             "Month": month,
-            "Transport Methods": list(transport_methods[month]),
-            "Average Emissions": avg_emissions,
+            "Transport Methods": list(state.categories),
+            "Average Emissions": state.means()['emissions'],
             "Risk Levels": {}
         }
 
         # Summarize risk levels for the month
-        risk_counts = monthly_risk_summary[month]
-        total_risks = sum(risk_counts.values())
-        for risk_level, count in risk_counts.items():
+        total_risks = sum(state.risk_counts.values())
+        for (_, risk_level), count in state.risk_counts.items():
             month_summary["Risk Levels"][risk_level] = f"{(count / total_risks) * 100:.2f}%"
 
         formatted_output.append(month_summary)
@@ -1,169 +1,675 @@
-from flask import Flask, request, jsonify
+import functools
+import json
+import time
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context, g
 from flask_cors import CORS, cross_origin
 # Import model prediction functions from individual model files
 from Transport.transport import predict_emissions_and_risk as predict_transport_emissions_trans
 from Transport.transport import calculate_monthly_summary_and_format as calculate_monthly_summary_and_format_trans
+import Transport.transport as transport_module
 from Fuel.fuel import predict_emissions_and_risk as predict_fuel_emissions  # Import the fuel model's prediction function
 from Fuel.fuel import calculate_monthly_summary_and_format as calculate_monthly_summary_and_format_fuel
+import Fuel.fuel as fuel_module
 from Electricity.electricity import predict_emissions_and_risk as predict_emissions_and_risk  # Import the appropriate function
 from Electricity.electricity import calculate_monthly_summary_and_format as calculate_monthly_summary_and_format  # Import the appropriate function
+from Electricity.electricity import group_by_state
+import Electricity.electricity as electricity_module
 from Explosives.explosive import predict_7_days_multiple_explosives as predict_7_days_multiple_explosives  # Import the appropriate function
 from Explosives.explosive import calculate_monthly_summary_and_format as calculate_monthly_summary_and_format_explosives
+import Explosives.explosive as explosive_module
+from Common.registry import load_in_background, load_all, readiness, models
+from Common.artifacts import memory_report
+from Common.encoding import unseen_stats
+from Common.batching import batching_stats
+from Common.cache import cached, cache_stats
+from Common.memo import track_request, request_dedup, memo_stats
+from Common.streaming import StreamPipeline, read_ndjson, stream_predictions
+from Common.rolling import RollingAccumulator, parse_windows, rolling_windows
+from Common.metrics import metrics, metric_labels, stage
+from Common.profiling import PROFILE_BUSY, PROFILE_HEADER, RequestProfile, profile_requested
+from Common.admission import Overloaded, admission, admission_stats, request_rows
+from Common.store import StoreConflict, store
+from Common.settings import MODEL_LOADING, WARM_UP, DEBUG, BATCH_THREADS, STREAM_CHUNK_DAYS, METRICS_ENABLED, PROFILE_TOKEN
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}})
 
-@app.route('/ml/transport', methods=['POST'])
-def ml_transport():
+# Read every model's artifacts in parallel threads instead of one after another at import time
+if MODEL_LOADING == 'background':
+    load_in_background(warm_up=WARM_UP)
+elif MODEL_LOADING == 'preload':
+    load_all(warm_up=WARM_UP)
+
+@app.before_request
+def start_dedup_counter():
+    track_request()
+
+@app.after_request
+def add_dedup_headers(response):
     """
-    Flask route for the transport model that accepts input data,
-    processes it, and returns predictions with risk levels.
+    Report how many feature rows the row memo saved for this request.
     """
-    try:
-        # Parse the JSON data from the POST request
-        data = request.get_json()
+    counter = request_dedup.get()
+    if counter is not None and counter.rows:
+        response.headers['X-ML-Rows'] = str(counter.rows)
+        response.headers['X-ML-Unique-Rows'] = str(counter.unique_rows)
+        response.headers['X-ML-Memo-Hits'] = str(counter.memo_hits)
+        response.headers['X-ML-Dedup-Ratio'] = f"{counter.dedup_ratio:.4f}"
+    return response
 
-        # Validate incoming data
-        if 'days_data' not in data:
-            return jsonify({
-                'status': 'error',
-                'message': 'Missing required field: days_data.'
-            }), 400
+@app.before_request
+def start_request_metrics():
+    if METRICS_ENABLED:
+        g.request_started = time.perf_counter()
+        # Label by route pattern, so unknown paths don't create new series
+        metric_labels.set((request.url_rule.rule if request.url_rule else 'unmatched', 'none'))
 
-        # Extract the necessary fields
-        daily_transport_data = data['days_data']
+@app.after_request
+def record_request_metrics(response):
+    if METRICS_ENABLED and 'request_started' in g:
+        metrics.observe_request(metric_labels.get()[0], response.status_code, time.perf_counter() - g.request_started)
+    return response
+
+@app.before_request
+def start_profile():
+    """
+    Run an /ml/* request under cProfile when it carries ML_PROFILE_TOKEN.
+    Only the request thread is profiled: /ml/batch sections show up as the
+    wait for their results, and NDJSON streams only up to the first chunk.
+    While another request is being captured it runs unprofiled instead.
+    """
+    if PROFILE_TOKEN and request.url_rule and request.url_rule.rule.startswith('/ml/') and profile_requested(request):
+        g.profile = RequestProfile(request.url_rule.rule, request.headers.get('X-Request-ID')).start()
+        g.profile_busy = g.profile is None
 
-        # Call the transport model's prediction function
-        daily_predictions = predict_transport_emissions_trans(daily_transport_data)
+@app.after_request
+def finish_profile(response):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop()
+        response.headers['X-ML-Profile-Id'] = profile.request_id
+    elif g.get('profile_busy'):
+        response.headers[PROFILE_HEADER] = PROFILE_BUSY
+    return response
+
+@app.teardown_request
+def stop_profile(exception):
+    # after_request is skipped when the view raised; still write the capture
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop()
+
+def admission_route():
+    """
+    Name of the current request's route for the per-route admission limits:
+    its path after /ml/ ('fuel', 'batch'), or '<model>/sites' for the site store.
+    """
+    model = request.view_args.get('model')
+    if model is not None:
+        return f"{model}/sites"
+    return request.url_rule.rule.removeprefix('/ml/')
+
+def admitted(view):
+    """
+    Run an /ml/* route only once admission control (ML_ADMISSION) gives the
+    request a slot, held until the response, or a streamed response's last
+    line, is done. Returns the view unchanged when admission control is off.
+    """
+    if admission is None:
+        return view
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        ticket = admission.admit(admission_route(), request_rows(request))
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            ticket.release()
+            raise
+        if response.is_streamed:
+            response.call_on_close(ticket.release)
+        else:
+            ticket.release()
+        return response
+    return wrapper
+
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    metrics.count_error('overloaded')
+    response = jsonify({
+        'status': 'error',
+        'message': str(e)
+    })
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, e.status
+
+def label_model(model):
+    """
+    Record the rest of this request's (or /ml/batch section's) metrics under model.
+    """
+    if METRICS_ENABLED:
+        metric_labels.set((metric_labels.get()[0], model))
+
+@app.route('/metrics', methods=['GET'])
+def ml_metrics():
+    """
+    Per-stage latency histograms, row and error counts in Prometheus text format.
+    """
+    if not METRICS_ENABLED:
+        return jsonify({'status': 'error', 'message': 'Metrics are disabled; set ML_METRICS=1.'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/ml/ready', methods=['GET'])
+def ml_ready():
+    """
+    Readiness probe: per-model load state and timing, 503 until every model is
+    loaded, plus the category values each encoder has seen but was not trained on.
+    """
+    ready, statuses = readiness()
+    response = {
+        'status': 'ready' if ready else 'loading',
+        'models': statuses,
+        'unseen_categories': unseen_stats()
+    }
+    return jsonify(response), 200 if ready else 503
+
+@app.route('/ml/memory', methods=['GET'])
+def ml_memory():
+    """
+    Resident vs shared memory of each model's memory-mapped forest, for sizing hosts.
+    """
+    return jsonify(memory_report(models)), 200
+
+@app.route('/ml/batching', methods=['GET'])
+def ml_batching():
+    """
+    Micro-batching counters per model: batch sizes and queue waits.
+    """
+    return jsonify(batching_stats()), 200
+
+@app.route('/ml/admission', methods=['GET'])
+def ml_admission():
+    """
+    Admission control lanes: slots, queue depth, waits and rejections.
+    """
+    return jsonify(admission_stats()), 200
+
+@app.route('/ml/cache', methods=['GET'])
+def ml_cache():
+    """
+    Result cache counters: hits, misses, single-flight waits and evictions.
+    """
+    return jsonify(cache_stats()), 200
+
+@app.route('/ml/memo', methods=['GET'])
+def ml_memo():
+    """
+    Row memo counters per model: rows seen, unique rows, memo hits and dedup ratio.
+    """
+    return jsonify(memo_stats()), 200
 
-        # Calculate monthly summary
-        monthly_summary = calculate_monthly_summary_and_format_trans(daily_predictions)
+MODEL_MODULES = {
+    'transport': transport_module,
+    'explosive': explosive_module,
+    'fuel': fuel_module,
+    'electricity': electricity_module
+}
 
-        # Return the monthly summary as a JSON response
-        response = {
+def rolling_analytics(model, data, daily_predictions):
+    """
+    Rolling-window totals, means and peak-risk counts per pollutant of a
+    model's predictions, for payloads that opt in with "rolling_windows"
+    (true for 7 and 30 days, or a list of window lengths in days).
+    """
+    module = MODEL_MODULES[model]
+    windows = parse_windows(data['rolling_windows'])
+    with stage('rolling'):
+        return rolling_windows(module.monthly_records(daily_predictions), module.monthly_aggregator().pollutants,
+                               module.risk_table.labels[-1], windows, first_day=1)
+
+# Model pipelines: validate a parsed payload, predict, and build the response body.
+# Shared by the per-model routes and /ml/batch; bad input raises ValueError.
+def run_transport(data):
+    # Validate incoming data
+    if 'days_data' not in data:
+        raise ValueError('Missing required field: days_data.')
+
+    # Call the transport model's prediction function
+    daily_predictions = predict_transport_emissions_trans(
+        data['days_data'], normalize_units=data.get('normalize_units', False)
+    )
+
+    # Calculate monthly summary
+    with stage('aggregate'):
+        monthly_summary = calculate_monthly_summary_and_format_trans(daily_predictions, data.get('year'))
+
+    response = {
+        'status': 'success',
+        'monthly_summary': monthly_summary
+    }
+    if data.get('rolling_windows'):
+        response['rolling_windows'] = rolling_analytics('transport', data, daily_predictions)
+    return response
+
+def run_explosive(data):
+    # Validate incoming data
+    if 'days_data' not in data:
+        raise ValueError('Missing required field: days_data.')
+
+    # Call the explosive model's prediction function
+    daily_predictions = predict_7_days_multiple_explosives(data['days_data'])
+    # Calculate monthly summary
+    with stage('aggregate'):
+        monthly_summary = calculate_monthly_summary_and_format_explosives(daily_predictions, data.get('year'))
+
+    # The summary list is the whole response, unless rolling windows were asked for
+    if data.get('rolling_windows'):
+        return {
+            'monthly_summary': monthly_summary,
+            'rolling_windows': rolling_analytics('explosive', data, daily_predictions)
+        }
+    return monthly_summary
+
+def run_fuel(data):
+    # Validate incoming data
+    if 'days_data' not in data:
+        raise ValueError('Missing required field: days_data.')
+
+    # Call the fuel model's prediction function
+    daily_predictions = predict_fuel_emissions(data['days_data'])
+
+    # Calculate monthly summary
+    with stage('aggregate'):
+        monthly_summary = calculate_monthly_summary_and_format_fuel(daily_predictions, data.get('year'))
+
+    response = {
+        'status': 'success',
+        'monthly_summary': monthly_summary
+    }
+    if data.get('rolling_windows'):
+        response['rolling_windows'] = rolling_analytics('fuel', data, daily_predictions)
+    return response
+
+def run_electricity(data):
+    # days_data is a list of per-day dicts, or columnar: one array per field,
+    # optionally with a parallel state_name array covering several states
+    days_data = data.get('days_data')
+    multi_state = isinstance(days_data, dict) and 'state_name' in days_data
+
+    # Validate incoming data
+    if days_data is None or ('state_name' not in data and not multi_state):
+        raise ValueError('Missing required fields: days_data or state_name.')
+
+    # Call the electricity model's prediction function
+    predictions = predict_emissions_and_risk(days_data, data.get('state_name'))
+
+    if multi_state:
+        # One monthly summary per state, all predicted in a single model call
+        state_groups = group_by_state(predictions)
+        with stage('aggregate'):
+            states = [
+                {'state': state, 'monthly_summary': calculate_monthly_summary_and_format(state_predictions, data.get('year'))}
+                for state, state_predictions in state_groups.items()
+            ]
+        if data.get('rolling_windows'):
+            for state, state_predictions in zip(states, state_groups.values()):
+                state['rolling_windows'] = rolling_analytics('electricity', data, state_predictions)
+        return {
             'status': 'success',
-            'monthly_summary': monthly_summary
+            'states': states
         }
 
-        return jsonify(response), 200
+    with stage('aggregate'):
+        monthly_summary = calculate_monthly_summary_and_format(predictions, data.get('year'))
+
+    response = {
+        'status': 'success',
+        'state': data['state_name'],
+        'monthly_summary': monthly_summary
+    }
+    if data.get('rolling_windows'):
+        response['rolling_windows'] = rolling_analytics('electricity', data, predictions)
+    return response
+
+PIPELINES = {
+    'transport': run_transport,
+    'explosive': run_explosive,
+    'fuel': run_fuel,
+    'electricity': run_electricity
+}
+
+PIPELINE_MODELS = {pipeline: model for model, pipeline in PIPELINES.items()}
+
+# Payload fields the pipelines read; anything else (e.g. a /ml/batch section's id) doesn't change the result
+PIPELINE_FIELDS = ('days_data', 'year', 'normalize_units', 'state_name', 'rolling_windows')
+
+def run_pipeline(model, data):
+    """
+    Run a model's pipeline, answering repeated payloads from the result cache.
+    """
+    label_model(model)
+    key_data = {field: data[field] for field in PIPELINE_FIELDS if field in data} if isinstance(data, dict) else data
+    return cached(model, key_data, lambda: PIPELINES[model](data))
+
+# Streaming pipelines: the same models driven chunk by chunk over NDJSON input.
+# Options that would sit next to days_data in a JSON body come from the query string.
+def stream_rolling(model, args):
+    """
+    Factory of per-site rolling-window accumulators when ?rolling_windows= is given.
+    """
+    if not args.get('rolling_windows'):
+        return None
+    module = MODEL_MODULES[model]
+    windows = parse_windows(args['rolling_windows'])
+    return lambda: RollingAccumulator(module.monthly_aggregator().pollutants, module.risk_table.labels[-1], windows)
+
+def stream_transport(args):
+    normalize_units = args.get('normalize_units', '').lower() in ('1', 'true')
+    return StreamPipeline(
+        lambda days, start_day: predict_transport_emissions_trans(days, normalize_units=normalize_units, start_day=start_day),
+        transport_module.monthly_records,
+        lambda: transport_module.monthly_aggregator(args.get('year', type=int)),
+        transport_module.format_monthly_summary,
+        stream_rolling('transport', args)
+    )
+
+def stream_explosive(args):
+    return StreamPipeline(
+        lambda days, start_day: predict_7_days_multiple_explosives(days, start_day=start_day),
+        explosive_module.monthly_records,
+        lambda: explosive_module.monthly_aggregator(args.get('year', type=int)),
+        explosive_module.format_monthly_summary,
+        stream_rolling('explosive', args)
+    )
+
+def stream_fuel(args):
+    return StreamPipeline(
+        lambda days, start_day: predict_fuel_emissions(days, start_day=start_day)['predictions'],
+        fuel_module.monthly_records,
+        lambda: fuel_module.monthly_aggregator(args.get('year', type=int)),
+        fuel_module.format_monthly_summary,
+        stream_rolling('fuel', args)
+    )
 
+def stream_electricity(args):
+    if 'state_name' not in args:
+        raise ValueError('Missing required query parameter: state_name.')
+    state_name = args['state_name']
+    return StreamPipeline(
+        lambda days, start_day: predict_emissions_and_risk(days, state_name, start_day=start_day),
+        electricity_module.monthly_records,
+        lambda: electricity_module.monthly_aggregator(args.get('year', type=int)),
+        electricity_module.format_monthly_summary,
+        stream_rolling('electricity', args)
+    )
+
+STREAM_PIPELINES = {
+    run_transport: stream_transport,
+    run_explosive: stream_explosive,
+    run_fuel: stream_fuel,
+    run_electricity: stream_electricity
+}
+
+def stream_route(pipeline):
+    """
+    Answer an application/x-ndjson request (one day, or one {"site", "data"}
+    day, per line) with an NDJSON stream of per-chunk predictions followed by
+    each site's monthly summary, reading and predicting the body as it arrives.
+    """
+    try:
+        stream_pipeline = STREAM_PIPELINES[pipeline](request.args)
     except ValueError as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 400
 
+    messages = stream_predictions(read_ndjson(request.stream), stream_pipeline, STREAM_CHUNK_DAYS)
+    lines = (json.dumps(message) + '\n' for message in messages)
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+def run_route(pipeline):
+    """
+    Parse the request JSON, run a pipeline on it and map errors to 400/500 responses.
+    NDJSON requests are streamed instead (see stream_route).
+    """
+    label_model(PIPELINE_MODELS[pipeline])
+    if request.mimetype == 'application/x-ndjson':
+        return stream_route(pipeline)
+
+    try:
+        # Parse the JSON data from the POST request
+        with stage('parse'):
+            data = request.get_json()
+
+        result = run_pipeline(PIPELINE_MODELS[pipeline], data)
+
+        # Return the pipeline's response body as JSON
+        with stage('serialize'):
+            return jsonify(result), 200
+
+    except ValueError as e:
+        metrics.count_error('client')
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+
     except Exception as e:
+        metrics.count_error('server')
         return jsonify({
             'status': 'error',
             'message': f"An unexpected error occurred: {str(e)}"
         }), 500
 
+@app.route('/ml/transport', methods=['POST'])
+@admitted
+def ml_transport():
+    """
+    Flask route for the transport model that accepts input data,
+    processes it, and returns predictions with risk levels.
+    """
+    return run_route(run_transport)
+
 @app.route('/ml/explosive', methods=['POST'])
+@admitted
 def ml_explosive():
     """
     Flask route for the explosive model that accepts input data,
     processes it, and returns predictions with risk levels.
     """
-    data = request.get_json()  # Get the JSON data from the request
-    # Call the explosive model's prediction function
-    daily_predictions = predict_7_days_multiple_explosives(data['days_data'])
-    # Calculate monthly summary
-    monthly_summary = calculate_monthly_summary_and_format_explosives(daily_predictions)
-    return jsonify(monthly_summary)  # Return the monthly summary as a JSON response
+    label_model('explosive')
+    if request.mimetype == 'application/x-ndjson':
+        return stream_route(run_explosive)
+
+    with stage('parse'):
+        data = request.get_json()  # Get the JSON data from the request
+    try:
+        result = run_pipeline('explosive', data)
+    except ValueError as e:
+        # Invalid options (e.g. rolling_windows) are the client's error
+        metrics.count_error('client')
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    with stage('serialize'):
+        return jsonify(result)  # Return the monthly summary as a JSON response
 
 @app.route('/ml/fuel', methods=['POST'])
+@admitted
 def ml_fuel():
     """
     Flask route for the fuel model that accepts input data,
     processes it, and returns predictions with risk levels.
     """
-    try:
-        # Parse the JSON data from the POST request
-        data = request.get_json()
+    return run_route(run_fuel)
 
-        # Validate incoming data
-        if 'days_data' not in data:
-            return jsonify({
-                'status': 'error',
-                'message': 'Missing required field: days_data.'
-            }), 400
+@app.route('/ml/electricity', methods=['POST'])
+@cross_origin(origins='http://localhost:3000')  # Explicitly allow CORS on this route
+@admitted
+def ml_electricity():
+    """
+    Flask route for the electricity model that accepts input data,
+    processes it, and returns predictions with risk levels.
+    """
+    return run_route(run_electricity)
 
-        # Extract the necessary fields
-        daily_fuel_data = data['days_data']
+# Thread pool for /ml/batch sections; sklearn releases the GIL for much of predict
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_THREADS, thread_name_prefix='ml-batch')
 
-        # Call the fuel model's prediction function
-        daily_predictions = predict_fuel_emissions(daily_fuel_data)
+def run_section(index, section):
+    """
+    Run one /ml/batch section, capturing its timing and any error instead of raising.
+    """
+    started = time.perf_counter()
+    result = {
+        'id': section.get('id', index) if isinstance(section, dict) else index,
+        'model': section.get('model') if isinstance(section, dict) else None
+    }
 
-        # Calculate monthly summary
-        monthly_summary = calculate_monthly_summary_and_format_fuel(daily_predictions)
+    try:
+        if result['model'] not in PIPELINES:
+            raise ValueError(f"Unknown or missing model, expected one of {sorted(PIPELINES)}.")
+        result['result'] = run_pipeline(result['model'], section)
+        result['status'] = 'success'
 
-        # Return the monthly summary as a JSON response
-        response = {
-            'status': 'success',
-            'monthly_summary': monthly_summary
-        }
+    except ValueError as e:
+        metrics.count_error('client')
+        result['status'] = 'error'
+        result['message'] = str(e)
 
-        return jsonify(response), 200
+    except Exception as e:
+        metrics.count_error('server')
+        result['status'] = 'error'
+        result['message'] = f"An unexpected error occurred: {str(e)}"
 
-    except ValueError as e:
+    result['elapsed_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+@app.route('/ml/batch', methods=['POST'])
+@admitted
+def ml_batch():
+    """
+    Flask route that runs any mix of model sections (e.g. several mines' fuel,
+    transport, electricity and explosive data) concurrently in one request.
+    Each section is a model payload plus 'model' and an optional 'id'; a failing
+    section is reported in its own result without failing the others.
+    """
+    started = time.perf_counter()
+    data = request.get_json(silent=True)
+    sections = data.get('sections') if isinstance(data, dict) else None
+    if not isinstance(sections, list):
         return jsonify({
             'status': 'error',
-            'message': str(e)
+            'message': 'Missing required field: sections (a list of model payloads).'
         }), 400
 
-    except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': f"An unexpected error occurred: {str(e)}"
-        }), 500
+    # Run each section in a copy of this request's context so its rows are counted for the request
+    futures = [batch_executor.submit(copy_context().run, run_section, index, section) for index, section in enumerate(sections)]
+    results = [future.result() for future in futures]
 
-@app.route('/ml/electricity', methods=['POST'])
-@cross_origin(origins='http://localhost:3000')  # Explicitly allow CORS on this route
-def ml_electricity():
+    response = {
+        'status': 'success',
+        'elapsed_ms': (time.perf_counter() - started) * 1000,
+        'results': results
+    }
+    return jsonify(response), 200
+
+# Incremental mode (ML_STORE_PATH): a site's days are sent once, in any number of
+# requests, and its monthly summary is read back from the stored aggregates.
+# Options (year, normalize_units, state_name) come from the query string, as for NDJSON.
+def store_route(model, handler):
     """
-    Flask route for the electricity model that accepts input data,
-    processes it, and returns predictions with risk levels.
+    Run a site store handler for a model, mapping errors to 400/404/409/500 responses.
     """
+    if store is None:
+        return jsonify({'status': 'error', 'message': 'The site store is disabled; set ML_STORE_PATH.'}), 404
+    if model not in PIPELINES:
+        return jsonify({'status': 'error', 'message': f"Unknown model, expected one of {sorted(PIPELINES)}."}), 404
+    label_model(model)
+
     try:
-        # Parse JSON data from the POST request
-        data = request.get_json()
+        return handler(request.args.get('year', type=int))
 
-        # Validate incoming data
-        if 'days_data' not in data or 'state_name' not in data:
-            return jsonify({
-                'status': 'error',
-                'message': 'Missing required fields: days_data or state_name.'
-            }), 400
+    except StoreConflict as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 409
+
+    except ValueError as e:
+        metrics.count_error('client')
+        return jsonify({'status': 'error', 'message': str(e)}), 400
 
-        # Extract the necessary fields
-        days_data = data['days_data']
-        state_name = data['state_name']
+    except Exception as e:
+        metrics.count_error('server')
+        return jsonify({'status': 'error', 'message': f"An unexpected error occurred: {str(e)}"}), 500
 
-        # Call the electricity model's prediction function
-        predictions = predict_emissions_and_risk(days_data, state_name)
+@app.route('/ml/<model>/sites/<site>/days', methods=['POST'])
+@admitted
+def ml_site_days(model, site):
+    """
+    Predict a site's new days ({"days_data": [...], "start_day": optional}),
+    fold them into its stored monthly aggregates and return the updated
+    monthly summary. Days continue after the last stored day unless
+    start_day is given; days sent again replace the stored ones.
+    """
+    def append(year):
+        pipeline = STREAM_PIPELINES[PIPELINES[model]](request.args)
+        with stage('parse'):
+            data = request.get_json()
+        if not isinstance(data, dict) or not isinstance(data.get('days_data'), list):
+            raise ValueError('Missing required field: days_data.')
+        start_day = data.get('start_day')
+        if start_day is not None and not isinstance(start_day, int):
+            raise ValueError('start_day must be an integer.')
 
-        monthly_summary = calculate_monthly_summary_and_format(predictions)
-        # Return the predictions as a JSON response
-        response = {
-            'status': 'success',
-            'state': state_name,
-            'monthly_summary': monthly_summary
-        }
+        first_day, predictions, aggregator = store.append(model, site, year, pipeline, data['days_data'], start_day)
+        with stage('aggregate'):
+            monthly_summary = pipeline.summarize(aggregator)
+        with stage('serialize'):
+            return jsonify({
+                'status': 'success',
+                'site': site,
+                'first_day': first_day,
+                'last_day': first_day + len(data['days_data']) - 1,
+                'monthly_summary': monthly_summary
+            }), 200
 
-        return jsonify(response), 200
+    return store_route(model, append)
 
-    except ValueError as e:
+@app.route('/ml/<model>/sites/<site>/summary', methods=['GET'])
+def ml_site_summary(model, site):
+    """
+    Monthly summary of everything stored for a site, without any prediction.
+    """
+    def summary(year):
+        module = MODEL_MODULES[model]
+        stored = store.summary(model, site, year, module.monthly_aggregator(year))
+        if stored is None:
+            return jsonify({'status': 'error', 'message': f"Nothing stored for site '{site}'."}), 404
+        last_day, aggregator = stored
         return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 400
+            'status': 'success',
+            'site': site,
+            'last_day': last_day,
+            'monthly_summary': module.format_monthly_summary(aggregator)
+        }), 200
 
-    except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': f"An unexpected error occurred: {str(e)}"
-        }), 500
+    return store_route(model, summary)
+
+@app.route('/ml/<model>/sites/<site>', methods=['DELETE'])
+def ml_site_delete(model, site):
+    """
+    Forget a site's stored days and aggregates.
+    """
+    def delete(year):
+        if not store.delete(model, site, year):
+            return jsonify({'status': 'error', 'message': f"Nothing stored for site '{site}'."}), 404
+        return jsonify({'status': 'success', 'site': site}), 200
+
+    return store_route(model, delete)
 
 if __name__ == '__main__':
-    app.run(debug=True, port=8800)  # Run Flask app on port 8800
+    # Development server only; use serve.py for production
+    app.run(debug=DEBUG, port=8800)  # Run Flask app on port 8800
@@ -0,0 +1,209 @@
+"""
+Benchmarks for the four ML pipelines.
+
+Times every model's predict function, its monthly summary and its Flask
+route (through the test client, so JSON parsing and serialization count)
+across batch sizes, and writes the results to a JSON file. Models whose
+.pkl artifacts are missing are replaced by deterministic stand-ins
+(benchmarks/standins.py), recorded in the output.
+
+    cd Backend/ML
+    python -m benchmarks.bench --out bench.json
+    python -m benchmarks.bench --out new.json --baseline bench.json
+
+With --baseline, every case whose median got slower by more than
+--threshold is reported as a regression and the exit status is 1.
+The ML_* environment variables (e.g. ML_INFERENCE_MODE) apply as usual.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Models are loaded by the benchmark, after the stand-ins are in place
+os.environ.setdefault('ML_MODEL_LOADING', 'lazy')
+
+import numpy as np
+import sklearn
+from benchmarks.payloads import encoder_classes, fuel_days, explosive_days, transport_days, electricity_days, route_payload
+from benchmarks.standins import STANDIN_DIR, missing_artifacts, use_standins
+import Fuel.fuel as fuel_module
+import Explosives.explosive as explosive_module
+import Transport.transport as transport_module
+import Electricity.electricity as electricity_module
+from Common import settings
+
+MODELS = ('fuel', 'explosive', 'transport', 'electricity')
+DEFAULT_SIZES = (1, 10, 100, 1000, 10000, 100000)
+YEAR = 2023
+
+
+def predict_case(model, rng, classes, rows):
+    """
+    (predict callable, monthly summary callable) for rows entries over a year.
+    """
+    days = 365
+    if model == 'fuel':
+        data = fuel_days(rng, classes['fuel'], rows, days)
+        return (lambda: fuel_module.predict_emissions_and_risk(data),
+                lambda predictions: fuel_module.calculate_monthly_summary_and_format(predictions, YEAR))
+    if model == 'explosive':
+        data = explosive_days(rng, classes['explosive'], rows, days)
+        return (lambda: explosive_module.predict_7_days_multiple_explosives(data),
+                lambda predictions: explosive_module.calculate_monthly_summary_and_format(predictions, YEAR))
+    if model == 'transport':
+        data = transport_days(rng, classes['transport'], rows, days)
+        return (lambda: transport_module.predict_emissions_and_risk(data, normalize_units=True),
+                lambda predictions: transport_module.calculate_monthly_summary_and_format(predictions, YEAR))
+    data = electricity_days(rng, rows)
+    state_name = classes['electricity'][0]
+    return (lambda: electricity_module.predict_emissions_and_risk(data, state_name),
+            lambda predictions: electricity_module.calculate_monthly_summary_and_format(predictions, YEAR))
+
+
+def measure(function, repeat, budget):
+    """
+    Run function once to warm up, then up to repeat times (fewer when the
+    time budget in seconds runs out, but at least once). Returns durations.
+    """
+    function()
+    durations = []
+    started = time.perf_counter()
+    while len(durations) < repeat and (not durations or time.perf_counter() - started < budget):
+        run_started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - run_started)
+    return durations
+
+
+def summarize(name, rows, durations):
+    median = statistics.median(durations)
+    return {
+        'name': name,
+        'rows': rows,
+        'runs': len(durations),
+        'median_s': median,
+        'min_s': min(durations),
+        'mean_s': statistics.fmean(durations),
+        'rows_per_s': rows / median if median else None
+    }
+
+
+def run_benchmarks(models, sizes, repeat, budget, seed):
+    from app import app
+
+    client = app.test_client()
+    classes = encoder_classes()
+    results = []
+    for model in models:
+        for rows in sizes:
+            rng = np.random.default_rng(seed)
+            predict, summarize_month = predict_case(model, rng, classes, rows)
+            predictions = predict()
+            path, payload = route_payload(model, rng, classes, rows, days=365)
+
+            def post():
+                response = client.post(path, json=payload)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+            cases = [
+                (f'{model}.predict', predict),
+                (f'{model}.monthly_summary', lambda: summarize_month(predictions)),
+                (f'{model}.route', post)
+            ]
+            for name, function in cases:
+                result = summarize(name, rows, measure(function, repeat, budget))
+                results.append(result)
+                print(f"{name:28} {rows:>7} rows  median {result['median_s'] * 1000:10.3f} ms  "
+                      f"({result['rows_per_s']:,.0f} rows/s, {result['runs']} runs)", flush=True)
+    return results
+
+
+def metadata(standins):
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'standin_models': standins,
+        'settings': {
+            'inference_mode': settings.INFERENCE_MODE,
+            'artifact_format': settings.ARTIFACT_FORMAT,
+            'micro_batch_window_ms': settings.MICRO_BATCH_WINDOW_MS,
+            'row_memo_size': settings.ROW_MEMO_SIZE,
+            'result_cache_size': settings.RESULT_CACHE_SIZE,
+            'metrics': settings.METRICS_ENABLED
+        }
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Print each case against the baseline; returns the regressed cases.
+    """
+    base = {(result['name'], result['rows']): result for result in baseline['results']}
+    if baseline['meta'].get('standin_models') != results['meta']['standin_models']:
+        print("warning: baseline and current run use different stand-in models; timings are not comparable")
+    if baseline['meta'].get('settings') != results['meta']['settings']:
+        print(f"warning: settings differ from the baseline: {baseline['meta'].get('settings')}")
+
+    regressions = []
+    print(f"\n{'case':28} {'rows':>7} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for result in results['results']:
+        previous = base.get((result['name'], result['rows']))
+        if previous is None:
+            continue
+        change = result['median_s'] / previous['median_s'] - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(result)
+        print(f"{result['name']:28} {result['rows']:>7} {previous['median_s'] * 1000:12.3f} "
+              f"{result['median_s'] * 1000:12.3f} {change:+8.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ML pipelines and routes.')
+    parser.add_argument('--out', required=True, help='JSON file for the results')
+    parser.add_argument('--baseline', help='earlier results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative slowdown of the median counted as a regression (default 0.10)')
+    parser.add_argument('--models', default=','.join(MODELS), help='comma-separated models (default: all)')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='comma-separated row counts')
+    parser.add_argument('--repeat', type=int, default=7, help='timed runs per case (default 7)')
+    parser.add_argument('--budget', type=float, default=5.0, help='seconds per case before stopping early (default 5)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the payloads and stand-in models')
+    parser.add_argument('--standins', action='store_true', help='use stand-in models even where real artifacts exist')
+    args = parser.parse_args()
+
+    standins = use_standins(STANDIN_DIR, MODELS if args.standins else missing_artifacts(), seed=args.seed)
+    if standins:
+        print(f"Using stand-in models for: {', '.join(standins)}")
+
+    models = [model.strip() for model in args.models.split(',') if model.strip()]
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = {
+        'meta': metadata(standins),
+        'results': run_benchmarks(models, sizes, args.repeat, args.budget, args.seed)
+    }
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""
+Load generator for the /ml/* routes.
+
+Sends realistic payloads (see payloads.py) to a running service, or to one
+it starts itself with --start (benchmarks/server.py, on stand-in models for
+missing artifacts), and reports p50/p95/p99/max latency, error rate, status
+codes and achieved requests/sec per route.
+
+    cd Backend/ML
+    python -m benchmarks.load --start --concurrency 16 --duration 30
+    python -m benchmarks.load --url http://127.0.0.1:8800 --rate 50 --duration 60
+
+Closed loop (--concurrency N): N clients each send their next request as
+soon as the previous one is answered, so the offered load adapts to the
+service. Open loop (--rate R): requests arrive at R per second (Poisson by
+default) whether or not earlier ones are done; latency is measured from the
+scheduled arrival, so time spent waiting for a free client counts too.
+Raising --rate step by step shows where queuing starts.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('ML_MODEL_LOADING', 'lazy')
+
+import numpy as np
+from benchmarks.payloads import encoder_classes, route_payload
+from benchmarks.standins import MODULE_PATHS, STANDIN_DIR, use_standins
+
+ROUTES = ('fuel', 'explosive', 'transport', 'electricity')
+PAYLOADS_PER_ROUTE = 50
+
+
+def parse_range(value):
+    low, _, high = value.partition('-')
+    return int(low), int(high or low)
+
+
+def build_payloads(routes, classes, days, entries, seed):
+    """
+    PAYLOADS_PER_ROUTE encoded request bodies per route, each with a day count
+    drawn from days and entries per day (explosives, fuel fills, shipment
+    legs) drawn from entries; electricity always has one entry per day.
+    """
+    rng = np.random.default_rng(seed)
+    payloads = {}
+    for route in routes:
+        payloads[route] = []
+        for _ in range(PAYLOADS_PER_ROUTE):
+            day_count = int(rng.integers(days[0], days[1] + 1))
+            rows = day_count if route == 'electricity' else day_count * int(rng.integers(entries[0], entries[1] + 1))
+            path, body = route_payload(route, rng, classes, rows, day_count)
+            payloads[route].append((path, json.dumps(body).encode('utf-8')))
+    return payloads
+
+
+# Latency samples and outcomes per route, shared by all client threads
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, route, latency, status):
+        with self.lock:
+            self.samples.setdefault(route, []).append((latency, status))
+
+    def report(self, elapsed):
+        rows = {}
+        with self.lock:
+            samples = dict(self.samples)
+        samples['all'] = [sample for route_samples in samples.values() for sample in route_samples]
+        for route, route_samples in samples.items():
+            if not route_samples:
+                continue
+            latencies = np.array([latency for latency, _ in route_samples]) * 1000
+            statuses = {}
+            for _, status in route_samples:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            errors = sum(count for status, count in statuses.items() if not status.startswith('2'))
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            rows[route] = {
+                'requests': len(route_samples),
+                'errors': errors,
+                'error_rate': errors / len(route_samples),
+                'rps': len(route_samples) / elapsed,
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+                'max_ms': float(latencies.max()),
+                'statuses': statuses
+            }
+        return rows
+
+
+def send(base_url, path, body, timeout):
+    """
+    POST body and return the status code, or the exception's class name when
+    no response arrived (connection refused, timeout, ...).
+    """
+    request = urllib.request.Request(base_url + path, data=body, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+    except Exception as e:
+        return type(e).__name__
+
+
+def closed_loop(base_url, payloads, concurrency, duration, warmup, timeout, recorder, seed):
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def client(index):
+        rng = random.Random(seed + index)
+        routes = list(payloads)
+        while time.perf_counter() < stop_at:
+            route = rng.choice(routes)
+            path, body = rng.choice(payloads[route])
+            sent = time.perf_counter()
+            status = send(base_url, path, body, timeout)
+            if sent >= measure_from:
+                recorder.record(route, time.perf_counter() - sent, status)
+
+    threads = [threading.Thread(target=client, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def open_loop(base_url, payloads, rate, arrivals, max_in_flight, duration, warmup, timeout, recorder, seed):
+    rng = random.Random(seed)
+    routes = list(payloads)
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def request(route, path, body, scheduled):
+        status = send(base_url, path, body, timeout)
+        if scheduled >= measure_from:
+            recorder.record(route, time.perf_counter() - scheduled, status)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        scheduled = started
+        while scheduled < stop_at:
+            route = rng.choice(routes)
+            path, body = rng.choice(payloads[route])
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(request, route, path, body, scheduled)
+            scheduled += rng.expovariate(rate) if arrivals == 'poisson' else 1 / rate
+
+
+def wait_until_ready(base_url, server, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode} before it was ready")
+        try:
+            with urllib.request.urlopen(base_url + '/ml/ready', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server not ready after {timeout}s")
+
+
+def start_server(port, workers, standins, log):
+    env = dict(os.environ, ML_BIND=f'127.0.0.1:{port}')
+    env.pop('ML_MODEL_LOADING', None)
+    if workers:
+        env['ML_WORKERS'] = str(workers)
+    command = [sys.executable, '-m', 'benchmarks.server'] + (['--standins'] if standins else [])
+    output = open(log, 'w') if log else subprocess.DEVNULL
+    return subprocess.Popen(command, env=env, stdout=output, stderr=subprocess.STDOUT)
+
+
+def print_report(report, mode):
+    print(f"\n{mode}")
+    print(f"{'route':12} {'requests':>9} {'rps':>8} {'errors':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  statuses")
+    for route, row in report.items():
+        print(f"{route:12} {row['requests']:>9} {row['rps']:>8.1f} {row['error_rate']:>8.2%} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}  {row['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the ML service routes.')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', default='http://127.0.0.1:8800', help='base URL of a running service')
+    target.add_argument('--start', action='store_true', help='start a local server (benchmarks.server) for the run')
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument('--concurrency', type=int, default=8, help='closed loop: number of clients (default 8)')
+    load.add_argument('--rate', type=float, help='open loop: requests per second')
+    parser.add_argument('--arrivals', choices=['poisson', 'uniform'], default='poisson', help='open loop arrival process')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='open loop: most requests outstanding at once')
+    parser.add_argument('--duration', type=float, default=30, help='seconds measured (default 30)')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds sent before measuring (default 3)')
+    parser.add_argument('--routes', default=','.join(ROUTES), help='comma-separated routes to mix (default: all)')
+    parser.add_argument('--days', type=parse_range, default=(1, 30), help='days per request, e.g. 7 or 1-30 (default 1-30)')
+    parser.add_argument('--entries', type=parse_range, default=(1, 5),
+                        help='entries per day (explosives, fills, legs), e.g. 1-5 (default 1-5)')
+    parser.add_argument('--timeout', type=float, default=60, help='per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--standins', action='store_true', help='use stand-in models even where real artifacts exist')
+    parser.add_argument('--port', type=int, default=8801, help='port of the --start server (default 8801)')
+    parser.add_argument('--workers', type=int, help='ML_WORKERS for the --start server')
+    parser.add_argument('--server-log', help='file for the --start server output')
+    parser.add_argument('--out', help='JSON file for the report')
+    args = parser.parse_args()
+
+    # Payload categories come from the same models the server loads
+    use_standins(STANDIN_DIR, list(MODULE_PATHS) if args.standins else None)
+    routes = [route.strip() for route in args.routes.split(',') if route.strip()]
+    payloads = build_payloads(routes, encoder_classes(), args.days, args.entries, args.seed)
+
+    server = None
+    base_url = args.url.rstrip('/')
+    if args.start:
+        base_url = f'http://127.0.0.1:{args.port}'
+        server = start_server(args.port, args.workers, args.standins, args.server_log)
+
+    try:
+        if server is not None:
+            wait_until_ready(base_url, server, timeout=120)
+        recorder = Recorder()
+        if args.rate:
+            mode = f"open loop, {args.rate:g} req/s ({args.arrivals}), {args.duration:g}s"
+            open_loop(base_url, payloads, args.rate, args.arrivals, args.max_in_flight,
+                      args.duration, args.warmup, args.timeout, recorder, args.seed)
+        else:
+            mode = f"closed loop, {args.concurrency} clients, {args.duration:g}s"
+            closed_loop(base_url, payloads, args.concurrency, args.duration, args.warmup, args.timeout, recorder, args.seed)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=60)
+
+    report = recorder.report(args.duration)
+    print_report(report, mode)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'mode': mode, 'url': base_url, 'routes': report}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
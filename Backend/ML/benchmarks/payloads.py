@@ -0,0 +1,86 @@
+"""
+Synthetic inputs for the four models, shaped like real site logs: entries
+spread over days, categories drawn from the encoders' classes and quantities
+in plausible ranges. Shared by the benchmarks and the load generator.
+"""
+import numpy as np
+
+WEIGHT_UNITS = ['g', 'kg', 'lb', 'mt']
+DISTANCE_UNITS = ['km', 'mi']
+
+
+def entries_per_day(rows, days):
+    """
+    Split rows as evenly as possible over days (at most one day per row).
+    """
+    days = max(1, min(days, rows))
+    counts = np.full(days, rows // days)
+    counts[:rows % days] += 1
+    return counts.tolist()
+
+
+def split_days(entries, rows, days):
+    entries = iter(entries)
+    return [[next(entries) for _ in range(count)] for count in entries_per_day(rows, days)]
+
+
+def fuel_days(rng, fuel_types, rows, days=7):
+    fuels = rng.choice(fuel_types, rows).tolist()
+    volumes = rng.uniform(10, 2000, rows).round(2).tolist()
+    return split_days(zip(fuels, volumes), rows, days)
+
+
+def explosive_days(rng, explosive_types, rows, days=7):
+    explosives = rng.choice(explosive_types, rows).tolist()
+    amounts = rng.uniform(50, 5000, rows).round(2).tolist()
+    return split_days(([explosive, amount] for explosive, amount in zip(explosives, amounts)), rows, days)
+
+
+def transport_days(rng, transport_methods, rows, days=7):
+    legs = zip(rng.choice(WEIGHT_UNITS, rows).tolist(), rng.uniform(1, 1000, rows).round(2).tolist(),
+               rng.choice(DISTANCE_UNITS, rows).tolist(), rng.uniform(5, 3000, rows).round(1).tolist(),
+               rng.choice(transport_methods, rows).tolist())
+    return split_days(legs, rows, days)
+
+
+def electricity_days(rng, rows):
+    # One entry per day
+    columns = zip(rng.uniform(10, 5000, rows).round(2).tolist(), rng.uniform(1, 100, rows).round(2).tolist(),
+                  rng.uniform(100, 1000, rows).round(2).tolist())
+    return [{'energyPerTime': energy, 'responsibleArea': responsible, 'totalArea': total}
+            for energy, responsible, total in columns]
+
+
+def route_payload(model, rng, classes, rows, days=7):
+    """
+    (path, JSON body) of a request to a model's route with rows entries over
+    days days (electricity always has one entry per day).
+    """
+    if model == 'fuel':
+        return '/ml/fuel', {'days_data': fuel_days(rng, classes['fuel'], rows, days)}
+    if model == 'explosive':
+        return '/ml/explosive', {'days_data': explosive_days(rng, classes['explosive'], rows, days)}
+    if model == 'transport':
+        return '/ml/transport', {'days_data': transport_days(rng, classes['transport'], rows, days),
+                                 'normalize_units': True}
+    if model == 'electricity':
+        return '/ml/electricity', {'days_data': electricity_days(rng, rows),
+                                   'state_name': str(rng.choice(classes['electricity']))}
+    raise ValueError(f"Unknown model '{model}'")
+
+
+def encoder_classes():
+    """
+    Category classes of every model's encoder, loading the models if needed.
+    """
+    from Fuel.fuel import fuel_model
+    from Explosives.explosive import explosive_model
+    from Transport.transport import transport_model
+    from Electricity.electricity import electricity_model
+
+    return {
+        'fuel': [str(value) for value in fuel_model.get().label_encoder.classes_],
+        'explosive': [str(value) for value in explosive_model.get().le.classes_],
+        'transport': [str(value) for value in transport_model.get().transport_label_encoder.classes_],
+        'electricity': [str(value) for value in electricity_model.get().label_encoder.classes_]
+    }
@@ -0,0 +1,29 @@
+"""
+Starts the production server (serve.py) with stand-in models in place of
+any missing artifacts, so the service can be load tested without the real
+.pkl files:
+
+    cd Backend/ML
+    python -m benchmarks.server [--standins]
+
+--standins uses stand-ins for every model even where real artifacts exist.
+Configured through the usual ML_* environment variables (ML_BIND, ML_WORKERS, ...).
+"""
+import os
+import sys
+
+os.environ.setdefault('ML_MODEL_LOADING', 'preload')
+
+from benchmarks.standins import MODULE_PATHS, STANDIN_DIR, use_standins
+import serve
+
+
+def main():
+    standins = use_standins(STANDIN_DIR, list(MODULE_PATHS) if '--standins' in sys.argv[1:] else None)
+    if standins:
+        print(f"Using stand-in models for: {', '.join(standins)}", flush=True)
+    serve.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Small deterministic stand-in artifacts for the four models.
+
+The real .pkl files are not in the repository. The stand-ins have the same
+feature layout, encoder classes (taken from the frontend's option lists) and
+output shapes, so every code path can be exercised and timed without them.
+Their predictions are meaningless.
+"""
+import os
+import joblib
+import sklearn
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+import Fuel.fuel as fuel_module
+import Explosives.explosive as explosive_module
+import Transport.transport as transport_module
+import Electricity.electricity as electricity_module
+
+FUEL_TYPES = ['cng', 'diesel', 'Diesel (retail station biofuel blend)', 'lpg', 'petrol',
+              'Petrol (retail station biofuel blend)']
+EXPLOSIVE_TYPES = ['Black powder', 'Smokeless powder', 'Dynamite, straight', 'Dynamite, ammonia',
+                   'Dynamite, gelatin', 'ANFO', 'TNT', 'RDX', 'PETN']
+TRANSPORT_METHODS = ['truck', 'ship', 'train', 'plane']
+STATE_NAMES = ['andhra pradesh', 'chattisgarh', 'jharkhand', 'madhya pradesh', 'maharashtra', 'orissa', 'west bengal']
+
+# Module whose artifact paths each stand-in replaces, and the path attributes it loads
+MODULE_PATHS = {
+    'fuel': (fuel_module, ('model_path', 'scaler_path', 'label_encoder_path')),
+    'explosive': (explosive_module, ('model_path', 'scaler_path', 'label_encoder_path')),
+    'transport': (transport_module, ('model_path', 'label_encoder_path')),
+    'electricity': (electricity_module, ('model_path', 'scaler_path', 'label_encoder_path'))
+}
+
+# Where the benchmarks and the load generator's server keep trained stand-ins
+STANDIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.standins')
+
+N_SAMPLES = 4000
+N_ESTIMATORS = 50
+MAX_DEPTH = 12
+
+
+def missing_artifacts():
+    """
+    Names of the models whose real artifacts are not all on disk.
+    """
+    return [name for name, (module, attributes) in MODULE_PATHS.items()
+            if not all(os.path.exists(getattr(module, attribute)) for attribute in attributes)]
+
+
+def fit_forest(X, y, seed):
+    return RandomForestRegressor(n_estimators=N_ESTIMATORS, max_depth=MAX_DEPTH, random_state=seed).fit(X, y)
+
+
+def category_quantity_model(categories, columns, n_outputs, rng, seed):
+    """
+    Encoder, scaler and forest for [encoded category, quantity] -> n_outputs
+    emissions, growing with the quantity at a per-category rate.
+    """
+    encoder = LabelEncoder().fit(categories)
+    codes = rng.integers(0, len(categories), N_SAMPLES)
+    quantities = rng.uniform(1, 5000, N_SAMPLES)
+    X = pd.DataFrame({columns[0]: codes, columns[1]: quantities}, dtype=float)
+    scaler = StandardScaler().fit(X)
+    rates = rng.uniform(0.1, 3.0, (len(categories), n_outputs))
+    y = quantities[:, None] * rates[codes] * rng.uniform(0.9, 1.1, (N_SAMPLES, n_outputs))
+    return encoder, scaler, fit_forest(scaler.transform(X), y, seed)
+
+
+def build_standins(directory, seed=0):
+    """
+    Train all stand-ins with a fixed seed and write them under directory,
+    one subdirectory per model with the file names the modules expect.
+    Returns {model: {path attribute: file path}}.
+    """
+    rng = np.random.default_rng(seed)
+    paths = {name: {attribute: os.path.join(directory, name, os.path.basename(getattr(module, attribute)))
+                    for attribute in attributes}
+             for name, (module, attributes) in MODULE_PATHS.items()}
+    artifacts = {}
+
+    encoder, scaler, model = category_quantity_model(
+        FUEL_TYPES, ['Fuel', 'Quantity Fuel Consumed (liters)'], len(fuel_module.EMISSION_TYPES), rng, seed)
+    artifacts['fuel'] = {'model_path': model, 'scaler_path': scaler, 'label_encoder_path': encoder}
+
+    encoder, scaler, model = category_quantity_model(
+        EXPLOSIVE_TYPES, ['explosiveType', 'amount'], len(explosive_module.EMISSION_COLUMNS), rng, seed)
+    artifacts['explosive'] = {'model_path': model, 'scaler_path': scaler, 'label_encoder_path': encoder}
+
+    # Transport is trained on unscaled [weight, distance, method]
+    encoder = LabelEncoder().fit(TRANSPORT_METHODS)
+    X = pd.DataFrame({
+        'weight_value': rng.uniform(1, 1000, N_SAMPLES),
+        'distance_value': rng.uniform(1, 5000, N_SAMPLES),
+        'transport_method': rng.integers(0, len(TRANSPORT_METHODS), N_SAMPLES)
+    })
+    rates = rng.uniform(0.01, 1.0, len(TRANSPORT_METHODS))
+    y = X['weight_value'] * X['distance_value'] * rates[X['transport_method']] / 1000
+    artifacts['transport'] = {'model_path': fit_forest(X, y, seed), 'label_encoder_path': encoder}
+
+    # Electricity is trained on scaled [state, energyPerTime, responsibleArea, totalArea]
+    encoder = LabelEncoder().fit(STATE_NAMES)
+    X = pd.DataFrame({
+        'stateName': rng.integers(0, len(STATE_NAMES), N_SAMPLES),
+        'energyPerTime': rng.uniform(10, 5000, N_SAMPLES),
+        'responsibleArea': rng.uniform(1, 100, N_SAMPLES),
+        'totalArea': rng.uniform(100, 1000, N_SAMPLES)
+    }, dtype=float)
+    scaler = StandardScaler().fit(X)
+    factors = rng.uniform(0.5, 1.0, len(STATE_NAMES))
+    y = X['energyPerTime'] * X['responsibleArea'] / X['totalArea'] * factors[X['stateName'].astype(int)] * 10
+    artifacts['electricity'] = {'model_path': fit_forest(scaler.transform(X), y, seed),
+                                'scaler_path': scaler, 'label_encoder_path': encoder}
+
+    for name, objects in artifacts.items():
+        os.makedirs(os.path.join(directory, name), exist_ok=True)
+        for attribute, obj in objects.items():
+            joblib.dump(obj, paths[name][attribute])
+    return paths
+
+
+def use_standins(directory, names=None, seed=0):
+    """
+    Point the given models (default: those with missing artifacts) at
+    stand-ins under directory, training them first if they are not there.
+    Must run before the models are loaded. Returns the names switched.
+    """
+    names = missing_artifacts() if names is None else list(names)
+    if not names:
+        return names
+
+    # Pickles are tied to the seed and the sklearn version that wrote them
+    directory = os.path.join(directory, f'seed-{seed}-sklearn-{sklearn.__version__}')
+    marker = os.path.join(directory, 'complete')
+    if not os.path.exists(marker):
+        build_standins(directory, seed)
+        open(marker, 'w').close()
+
+    for name in names:
+        module, attributes = MODULE_PATHS[name]
+        for attribute in attributes:
+            setattr(module, attribute, os.path.join(directory, name, os.path.basename(getattr(module, attribute))))
+    return names
@@ -0,0 +1,296 @@
+"""
+Offline bulk scorer for historical back-fills.
+
+Reads a CSV of records in fixed-size chunks, scores the chunks in a process
+pool with the same model modules the Flask service uses, and writes
+
+    <out>/predictions.csv       every input row with its predictions and risk levels
+    <out>/monthly_summary.json  the model's monthly summary over all rows
+    <out>/progress.json         checkpoint and throughput (rows/sec)
+
+    python score.py fuel fuel_2023.csv --out out/fuel_2023 --year 2023
+
+Input columns per model (one row per record, `day` is the day of the year):
+
+    fuel         day, fuel_type, volume
+    explosive    day, explosive_type, amount
+    transport    day, weight_unit, weight_value, distance_unit, distance_value, transport_method
+    electricity  day, state_name, energyPerTime, responsibleArea, totalArea
+                 (state_name may be given once with --state-name instead)
+
+Each finished chunk is checkpointed under <out>/chunks; running the same
+command again after an interruption only scores the chunks still missing.
+Rows are written in day order within each chunk; the `row` column is the
+row's position in the input file.
+"""
+import argparse
+import json
+import os
+import pickle
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import pandas as pd
+
+# Models are loaded once in this process, before the pool forks
+os.environ.setdefault('ML_MODEL_LOADING', 'lazy')
+
+import Fuel.fuel as fuel_module
+import Explosives.explosive as explosive_module
+import Transport.transport as transport_module
+import Electricity.electricity as electricity_module
+
+INPUT_COLUMNS = {
+    'fuel': ['day', 'fuel_type', 'volume'],
+    'explosive': ['day', 'explosive_type', 'amount'],
+    'transport': ['day', 'weight_unit', 'weight_value', 'distance_unit', 'distance_value', 'transport_method'],
+    'electricity': ['day', 'state_name', 'energyPerTime', 'responsibleArea', 'totalArea']
+}
+
+MODULES = {
+    'fuel': fuel_module,
+    'explosive': explosive_module,
+    'transport': transport_module,
+    'electricity': electricity_module
+}
+
+MODELS = {
+    'fuel': fuel_module.fuel_model,
+    'explosive': explosive_module.explosive_model,
+    'transport': transport_module.transport_model,
+    'electricity': electricity_module.electricity_model
+}
+
+
+# Function to group a day-sorted chunk into the days_data lists the predict functions take
+def group_days(chunk, columns):
+    first_day = int(chunk['day'].iloc[0])
+    days_data = [[] for _ in range(int(chunk['day'].iloc[-1]) - first_day + 1)]
+    for day, *values in chunk[['day'] + columns].itertuples(index=False):
+        days_data[int(day) - first_day].append(tuple(values))
+    return days_data, first_day
+
+
+# Per-model chunk predictors: a day-sorted chunk in, the model's predictions out
+def predict_fuel(chunk, options):
+    days_data, first_day = group_days(chunk, ['fuel_type', 'volume'])
+    return fuel_module.predict_emissions_and_risk(days_data, start_day=first_day)
+
+
+def predict_explosive(chunk, options):
+    days_data, first_day = group_days(chunk, ['explosive_type', 'amount'])
+    return explosive_module.predict_7_days_multiple_explosives(days_data, start_day=first_day)
+
+
+def predict_transport(chunk, options):
+    days_data, first_day = group_days(chunk, INPUT_COLUMNS['transport'][1:])
+    return transport_module.predict_emissions_and_risk(
+        days_data, normalize_units=options['normalize_units'], start_day=first_day
+    )
+
+
+def predict_electricity(chunk, options):
+    # One predict call per state; entries are numbered by their own day
+    predictions = []
+    for state_name, state_rows in chunk.groupby('state_name', sort=False):
+        days_data = state_rows[['energyPerTime', 'responsibleArea', 'totalArea']].to_dict('records')
+        state_predictions = electricity_module.predict_emissions_and_risk(days_data, state_name)
+        for prediction, day in zip(state_predictions, state_rows['day'].tolist()):
+            prediction['Entry No '] = day
+        predictions.extend(state_predictions)
+    return predictions
+
+
+PREDICTORS = {
+    'fuel': predict_fuel,
+    'explosive': predict_explosive,
+    'transport': predict_transport,
+    'electricity': predict_electricity
+}
+
+
+def prepare_chunk(model_name, chunk, options):
+    """
+    Check the columns and sort the chunk in the order its predictions come back.
+    """
+    if model_name == 'electricity' and options['state_name'] is not None and 'state_name' not in chunk.columns:
+        chunk = chunk.assign(state_name=options['state_name'])
+    missing = [column for column in INPUT_COLUMNS[model_name] if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing columns in input file: {missing}")
+
+    sort_keys = ['state_name', 'day'] if model_name == 'electricity' else ['day']
+    chunk = chunk[INPUT_COLUMNS[model_name]].assign(row=chunk.index)
+    return chunk.sort_values(sort_keys, kind='stable').reset_index(drop=True)
+
+
+def score_chunk(model_name, index, chunk, options, chunk_dir):
+    """
+    Score one chunk in a pool process: write its rows with predictions and its
+    partial monthly aggregate under chunk_dir, and return (index, rows, seconds).
+    """
+    started = time.perf_counter()
+    module = MODULES[model_name]
+    chunk = prepare_chunk(model_name, chunk, options)
+    predictions = PREDICTORS[model_name](chunk, options)
+
+    # monthly_records yields one record per row, in chunk order
+    aggregator = module.monthly_aggregator(options['year'])
+    emission_values, risk_values = [], []
+    for record in module.monthly_records(predictions):
+        aggregator.add(*record)
+        emission_values.append(record[1])
+        risk_values.append(dict((pollutant or 'risk_level', risk) for pollutant, risk in record[2]))
+
+    pollutants = aggregator.pollutants if len(aggregator.pollutants) > 1 else ['predicted_emission']
+    output = chunk.assign(**dict(zip(pollutants, np.asarray(emission_values, dtype=float).reshape(len(chunk), -1).T)))
+    risk_columns = pd.DataFrame(risk_values)
+    risk_columns.columns = [column if column == 'risk_level' else f"{column} risk" for column in risk_columns.columns]
+    output = pd.concat([output, risk_columns], axis=1)
+
+    # Write to temporary names first so a killed run never leaves a half-written checkpoint
+    path = chunk_path(chunk_dir, index)
+    output.to_csv(path + '.csv.tmp', index=False)
+    with open(path + '.pkl.tmp', 'wb') as f:
+        pickle.dump(aggregator, f)
+    os.replace(path + '.csv.tmp', path + '.csv')
+    os.replace(path + '.pkl.tmp', path + '.pkl')
+
+    return index, len(output), time.perf_counter() - started
+
+
+def chunk_path(chunk_dir, index):
+    return os.path.join(chunk_dir, f"chunk-{index:06d}")
+
+
+def chunk_done(chunk_dir, index):
+    return os.path.exists(chunk_path(chunk_dir, index) + '.pkl')
+
+
+def load_checkpoint(path, settings):
+    """
+    Read progress.json and make sure it was written for the same input and settings.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint['settings'] != settings:
+        raise SystemExit(f"{path} was written with different settings {checkpoint['settings']}; "
+                         f"use another --out directory or --restart.")
+    return checkpoint
+
+
+def write_json(path, data):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def combine_outputs(module, chunk_dir, chunks, out_dir, year):
+    """
+    Concatenate the chunk files into predictions.csv and merge the chunk
+    aggregates, in input order, into monthly_summary.json.
+    """
+    aggregator = module.monthly_aggregator(year)
+    with open(os.path.join(out_dir, 'predictions.csv'), 'w') as out:
+        for index in range(chunks):
+            path = chunk_path(chunk_dir, index)
+            with open(path + '.csv') as f:
+                if index:
+                    f.readline()  # Header is written once
+                shutil.copyfileobj(f, out)
+            with open(path + '.pkl', 'rb') as f:
+                aggregator.merge(pickle.load(f))
+    write_json(os.path.join(out_dir, 'monthly_summary.json'), module.format_monthly_summary(aggregator))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a CSV of records offline with one of the ML models.')
+    parser.add_argument('model', choices=sorted(MODULES))
+    parser.add_argument('input', help='CSV file to score')
+    parser.add_argument('--out', required=True, help='output and checkpoint directory')
+    parser.add_argument('--chunk-rows', type=int, default=100000, help='rows per chunk (default 100000)')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='pool size (default: CPU count)')
+    parser.add_argument('--memory-map', action='store_true', help='memory-map the input file instead of buffered reads')
+    parser.add_argument('--year', type=int, help='calendar year of the records, for leap-year months')
+    parser.add_argument('--state-name', help='electricity: state of every row when the file has no state_name column')
+    parser.add_argument('--normalize-units', action='store_true', help='transport: convert weights to kg and distances to km')
+    parser.add_argument('--restart', action='store_true', help='discard existing checkpoints in --out')
+    args = parser.parse_args()
+
+    module = MODULES[args.model]
+    options = {'year': args.year, 'state_name': args.state_name, 'normalize_units': args.normalize_units}
+    settings = {
+        'model': args.model,
+        'input': os.path.abspath(args.input),
+        'input_size': os.path.getsize(args.input),
+        'chunk_rows': args.chunk_rows,
+        'options': options
+    }
+
+    chunk_dir = os.path.join(args.out, 'chunks')
+    progress_path = os.path.join(args.out, 'progress.json')
+    if args.restart and os.path.exists(args.out):
+        shutil.rmtree(args.out)
+    os.makedirs(chunk_dir, exist_ok=True)
+    checkpoint = load_checkpoint(progress_path, settings)
+    previous_seconds = checkpoint['elapsed_seconds'] if checkpoint else 0.0
+
+    # Load the model before forking so the workers share its pages
+    MODELS[args.model].get()
+
+    started = time.perf_counter()
+    rows_scored = 0
+    # Rows of the chunks already on disk, counted as they are read rather than
+    # taken from the checkpoint, so a chunk scored again is never counted twice
+    resumed_rows = 0
+    chunks = 0
+    skipped = 0
+    pending = set()
+
+    def save_progress(**extra):
+        elapsed = time.perf_counter() - started
+        write_json(progress_path, dict({
+            'settings': settings,
+            'rows_scored': resumed_rows + rows_scored,
+            'elapsed_seconds': previous_seconds + elapsed,
+            'rows_per_second': rows_scored / elapsed if elapsed else 0.0
+        }, **extra))
+
+    def collect(done):
+        nonlocal rows_scored
+        for future in done:
+            index, rows, seconds = future.result()
+            rows_scored += rows
+            print(f"chunk {index}: {rows} rows in {seconds:.2f}s ({rows / seconds if seconds else 0:,.0f} rows/sec)")
+        save_progress(complete=False)
+
+    save_progress(complete=False)
+
+    reader = pd.read_csv(args.input, chunksize=args.chunk_rows, memory_map=args.memory_map)
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        for index, chunk in enumerate(reader):
+            chunks += 1
+            if chunk_done(chunk_dir, index):
+                skipped += 1
+                resumed_rows += len(chunk)
+                continue
+            # Keep at most two chunks per process in flight, so the input is never read far ahead
+            if len(pending) >= 2 * args.processes:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(score_chunk, args.model, index, chunk, options, chunk_dir))
+        collect(pending)
+
+    combine_outputs(module, chunk_dir, chunks, args.out, args.year)
+
+    elapsed = time.perf_counter() - started
+    save_progress(complete=True, chunks=chunks, chunks_resumed=skipped)
+    print(f"{args.model}: scored {rows_scored:,} rows in {elapsed:.2f}s "
+          f"({rows_scored / elapsed if elapsed else 0:,.0f} rows/sec), {skipped} of {chunks} chunks resumed from checkpoints")
+
+
+if __name__ == '__main__':
+    main()
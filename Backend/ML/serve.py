@@ -0,0 +1,71 @@
+"""
+Production entry point for the ML service.
+
+Loads every model once in the parent process, then forks a pool of gunicorn
+workers that share the loaded pages copy-on-write:
+
+    python serve.py
+
+Configured through the ML_* environment variables in Common/settings.py
+(ML_BIND, ML_WORKERS, ML_THREADS, ML_MAX_REQUESTS, ...). Send SIGHUP to gracefully
+replace all workers, SIGTERM to shut down after in-flight requests finish.
+The Flask development server (`python app.py`) stays the debug entry point.
+"""
+import gc
+import os
+
+# Models must be fully loaded before forking, not by background threads
+os.environ.setdefault('ML_MODEL_LOADING', 'preload')
+
+from gunicorn.app.base import BaseApplication
+from Common.settings import (
+    SERVER_BIND,
+    SERVER_WORKERS,
+    SERVER_THREADS,
+    SERVER_MAX_REQUESTS,
+    SERVER_MAX_REQUESTS_JITTER,
+    SERVER_GRACEFUL_TIMEOUT,
+    SERVER_TIMEOUT,
+)
+
+
+class PreforkServer(BaseApplication):
+    def __init__(self, application, options):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the garbage collector's generations,
+    # so collections in the workers don't write to (and un-share) those pages
+    gc.freeze()
+
+
+def main():
+    from app import app
+
+    options = {
+        'bind': SERVER_BIND,
+        'workers': SERVER_WORKERS,
+        'worker_class': 'gthread' if SERVER_THREADS > 1 else 'sync',
+        'threads': SERVER_THREADS,
+        'preload_app': True,
+        'max_requests': SERVER_MAX_REQUESTS,
+        'max_requests_jitter': SERVER_MAX_REQUESTS_JITTER,
+        'graceful_timeout': SERVER_GRACEFUL_TIMEOUT,
+        'timeout': SERVER_TIMEOUT,
+        'pre_fork': pre_fork,
+    }
+    PreforkServer(app, options).run()
+
+
+if __name__ == '__main__':
+    main()
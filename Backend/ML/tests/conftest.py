@@ -0,0 +1,44 @@
+"""
+Tests run against the stand-in models (benchmarks/standins.py), whether or
+not the real .pkl artifacts are present:
+
+    cd Backend/ML
+    python -m pytest tests
+"""
+import os
+import subprocess
+import sys
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_DIR)
+os.environ.setdefault('ML_MODEL_LOADING', 'lazy')
+
+import pytest
+from benchmarks.standins import MODULE_PATHS, STANDIN_DIR, use_standins
+
+use_standins(STANDIN_DIR, MODULE_PATHS)
+
+
+@pytest.fixture(scope='session')
+def client():
+    from app import app
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def classes():
+    from benchmarks.payloads import encoder_classes
+    return encoder_classes()
+
+
+def run_service_script(script, env):
+    """
+    Run a Python snippet in a fresh process with the service settings in env
+    (settings are read once at import), on the stand-in models; returns its stdout.
+    """
+    prelude = ('from benchmarks.standins import MODULE_PATHS, STANDIN_DIR, use_standins\n'
+               'use_standins(STANDIN_DIR, MODULE_PATHS)\n')
+    result = subprocess.run([sys.executable, '-c', prelude + script], cwd=ML_DIR, capture_output=True, text=True,
+                            env=dict(os.environ, **env), timeout=300)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
@@ -0,0 +1,70 @@
+import json
+from conftest import run_service_script
+
+BURST_SCRIPT = """
+import json
+import threading
+import time
+import numpy as np
+from benchmarks.payloads import route_payload
+from benchmarks.standins import FUEL_TYPES
+import Fuel.fuel as fuel_module
+from app import app
+
+# Reading the real artifacts takes seconds; the first request pays for that load
+load_artifacts = fuel_module.fuel_model.loader
+fuel_module.fuel_model.loader = lambda: time.sleep(1.5) or load_artifacts()
+path, body = route_payload('fuel', np.random.default_rng(0), {'fuel': FUEL_TYPES}, 7)
+assert app.test_client().post(path, json=body).status_code == 200
+
+statuses = []
+def send():
+    statuses.append(app.test_client().post(path, json=body).status_code)
+threads = [threading.Thread(target=send) for _ in range(64)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+print(json.dumps(statuses))
+"""
+
+
+def test_cold_lazy_load_does_not_inflate_cost_estimate():
+    statuses = json.loads(run_service_script(BURST_SCRIPT, {
+        'ML_MODEL_LOADING': 'lazy',
+        'ML_ADMISSION': '1',
+        'ML_ADMISSION_SLOTS': '2'
+    }))
+    assert len(statuses) == 64
+    assert statuses.count(200) == 64, statuses
+
+
+ROUTES_SCRIPT = """
+import json
+import numpy as np
+from benchmarks.payloads import route_payload
+from benchmarks.standins import FUEL_TYPES, EXPLOSIVE_TYPES
+from Common.admission import admission
+from app import app
+
+client = app.test_client()
+rng = np.random.default_rng(0)
+path, body = route_payload('fuel', rng, {'fuel': FUEL_TYPES}, 7)
+assert client.post(path, json=body).status_code == 200
+assert client.post('/ml/fuel/sites/a/days', json=body).status_code == 200
+assert client.post('/ml/fuel/sites/b/days', json=body).status_code == 200
+path, body = route_payload('explosive', rng, {'explosive': EXPLOSIVE_TYPES}, 7)
+assert client.post('/ml/explosive/sites/a/days', json=body).status_code == 200
+lane = admission.lanes['standard']
+print(json.dumps({'routes': sorted(lane.route_in_flight), 'limits': lane.route_limits}))
+"""
+
+
+def test_route_limits_are_keyed_per_route_and_model(tmp_path):
+    output = json.loads(run_service_script(ROUTES_SCRIPT, {
+        'ML_ADMISSION': '1',
+        'ML_ADMISSION_ROUTE_LIMITS': '/ml/fuel=2, batch=1, fuel/sites=1',
+        'ML_STORE_PATH': str(tmp_path / 'store.db')
+    }))
+    assert output['routes'] == ['explosive/sites', 'fuel', 'fuel/sites']
+    assert output['limits'] == {'fuel': 2, 'batch': 1, 'fuel/sites': 1}
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from benchmarks.payloads import route_payload
+
+MODELS = ['fuel', 'explosive', 'transport', 'electricity']
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_missing_days_data_is_a_client_error(client, model):
+    path, body = route_payload(model, np.random.default_rng(0), {model: ['x']}, 1)
+    del body['days_data']
+
+    response = client.post(path, json=body)
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith('Missing required field')
+
+
+def test_malformed_section_fails_alone(client, classes):
+    path, body = route_payload('explosive', np.random.default_rng(0), classes, 10)
+    sections = [dict(body, model='explosive', id='good'), {'model': 'explosive', 'id': 'no days'}]
+
+    response = client.post('/ml/batch', json={'sections': sections})
+    assert response.status_code == 200
+    good, bad = response.get_json()['results']
+    assert good['status'] == 'success'
+    assert bad['status'] == 'error'
+    assert bad['message'] == 'Missing required field: days_data.'
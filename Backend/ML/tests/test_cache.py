@@ -0,0 +1,24 @@
+import json
+from conftest import run_service_script
+
+BATCH_SCRIPT = """
+import json
+import numpy as np
+from benchmarks.payloads import route_payload
+from benchmarks.standins import FUEL_TYPES
+from app import app
+
+client = app.test_client()
+path, body = route_payload('fuel', np.random.default_rng(0), {'fuel': FUEL_TYPES}, 20)
+client.post(path, json=body)
+sections = [dict(body, model='fuel', id=f"mine-{index}") for index in range(3)]
+results = client.post('/ml/batch', json={'sections': sections}).get_json()['results']
+print(json.dumps({'ids': [result['id'] for result in results], 'cache': client.get('/ml/cache').get_json()}))
+"""
+
+
+def test_batch_sections_share_the_cached_result_of_their_payload():
+    output = json.loads(run_service_script(BATCH_SCRIPT, {'ML_RESULT_CACHE_SIZE': '16'}))
+    assert output['ids'] == ['mine-0', 'mine-1', 'mine-2']
+    assert output['cache']['misses'] == 1
+    assert output['cache']['hits'] + output['cache']['coalesced'] == 3
@@ -0,0 +1,13 @@
+import pytest
+
+
+@pytest.mark.parametrize('days_data', [
+    {'energyPerTime': 5, 'responsibleArea': [1], 'totalArea': [1], 'state_name': ['X']},
+    {'energyPerTime': [[5]], 'responsibleArea': [1], 'totalArea': [1], 'state_name': ['X']},
+    {'energyPerTime': [5, 6], 'responsibleArea': [1, 1], 'totalArea': [1, 1], 'state_name': 'XY'},
+    {'energyPerTime': [5, 6], 'responsibleArea': [1], 'totalArea': [1, 1], 'state_name': ['X', 'Y']},
+])
+def test_malformed_columnar_input_is_a_client_error(client, days_data):
+    response = client.post('/ml/electricity', json={'days_data': days_data})
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
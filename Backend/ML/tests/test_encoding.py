@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+from Common.encoding import MAX_ALIASES, MAX_UNSEEN_VALUES, OTHER_UNSEEN, PLACEHOLDER_CODE, CategoryEncoder, unseen_stats
+
+
+def test_alias_cache_is_bounded():
+    encoder = CategoryEncoder(SimpleNamespace(classes_=['Diesel', 'Petrol']), 'fuel', 'alias')
+    assert encoder.encode(['diesel']).tolist() == [0]
+
+    unseen = [f"unseen {index}" for index in range(MAX_ALIASES + 100)]
+    assert set(encoder.encode(unseen).tolist()) == {PLACEHOLDER_CODE}
+    assert len(encoder.aliases) == MAX_ALIASES
+    assert 'diesel' not in encoder.aliases
+    assert encoder.encode(['DIESEL', 'petrol ']).tolist() == [0, 1]
+
+
+def test_unseen_counts_are_bounded():
+    encoder = CategoryEncoder(SimpleNamespace(classes_=['Diesel', 'Petrol']), 'junk test', 'placeholder')
+    encoder.encode(['kerosene'] * 5)
+    junk = [f"junk {index}" for index in range(MAX_UNSEEN_VALUES * 3)]
+    encoder.encode(junk)
+    encoder.encode(junk[:10])
+
+    counts = encoder.unseen_counts
+    assert len(counts) == MAX_UNSEEN_VALUES + 1
+    assert counts['kerosene'] == 5
+    assert sum(counts.values()) == 5 + len(junk) + 10
+
+    stats = unseen_stats()['junk test']
+    assert stats['total'] == 5 + len(junk) + 10
+    assert OTHER_UNSEEN in stats['values']
+
+
+def test_unseen_counts_are_reported(client):
+    client.post('/ml/explosive', json={'days_data': [[['no such explosive', 10.0]]]})
+    unseen = client.get('/ml/ready').get_json()['unseen_categories']
+    assert unseen['explosiveType']['values']['no such explosive'] >= 1
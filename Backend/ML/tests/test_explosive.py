@@ -0,0 +1,69 @@
+import json
+import random
+import pandas as pd
+from benchmarks.standins import EXPLOSIVE_TYPES
+from Explosives.explosive import explosive_model, predict_7_days_multiple_explosives
+
+THRESHOLDS = {
+    'CO': [400, 700, 1000],
+    'NOx': [20, 40, 60],
+    'NH3': [50, 80, 120],
+    'HCN': [20, 50, 80],
+    'H2S': [20, 50, 80],
+    'SO2': [1, 5, 10],
+    'CO2': [1000, 5000, 10000]
+}
+
+
+def risk_evaluation(row):
+    risks = {}
+    for gas, levels in THRESHOLDS.items():
+        value = row.get(gas, 0)
+        if value > levels[2]:
+            risks[gas] = "Severe"
+        elif value > levels[1]:
+            risks[gas] = "High"
+        elif value > levels[0]:
+            risks[gas] = "Moderate"
+        else:
+            risks[gas] = "Low"
+    return risks
+
+
+def per_row_predictions(input_data):
+    """
+    The original one-DataFrame-per-explosive implementation, on the loaded artifacts.
+    """
+    artifacts = explosive_model.get()
+    classes = set(artifacts.le.classes_)
+    all_predictions = {}
+    for day, explosives in enumerate(input_data, start=1):
+        daily_predictions = []
+        for explosive_type, amount in explosives:
+            input_df = pd.DataFrame([[explosive_type, amount]], columns=['explosiveType', 'amount'])
+            input_df['explosiveType'] = input_df['explosiveType'].apply(
+                lambda x: artifacts.le.transform([x])[0] if isinstance(x, str) and x in classes else -1)
+            predicted_df = pd.DataFrame(artifacts.model.predict(artifacts.scaler.transform(input_df)),
+                                        columns=['CO', 'NOx', 'NH3', 'HCN', 'H2S', 'SO2', 'CO2'])
+            predicted_df['Explosive Type'] = explosive_type
+            predicted_df['Risk Evaluation'] = predicted_df.apply(risk_evaluation, axis=1)
+            ordered_columns = ['Explosive Type', 'Risk Evaluation', 'CO', 'NOx', 'NH3', 'HCN', 'H2S', 'SO2', 'CO2']
+            daily_predictions.append(predicted_df[ordered_columns].to_dict(orient='records'))
+        all_predictions[f"Day {day}"] = daily_predictions
+    return all_predictions
+
+
+def test_batched_predictions_match_per_row_path():
+    rng = random.Random(1)
+    types = EXPLOSIVE_TYPES[:4] + ['Unknown explosive']
+    input_data = [[[rng.choice(types), rng.choice([10, 500, 2500.5, 4999])] for _ in range(rng.randint(0, 4))]
+                  for _ in range(60)]
+    input_data[3] = []
+    input_data[4] = [['Unknown explosive', 1200]]
+
+    assert json.dumps(predict_7_days_multiple_explosives(input_data)) == json.dumps(per_row_predictions(input_data))
+
+
+def test_empty_input_has_no_days():
+    assert predict_7_days_multiple_explosives([]) == {}
+    assert predict_7_days_multiple_explosives([[], []]) == {'Day 1': [], 'Day 2': []}
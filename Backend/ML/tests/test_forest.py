@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from Common.forest import CompiledForest
+from Fuel.fuel import fuel_model
+from Electricity.electricity import electricity_model
+
+
+def fitted_forest(n_outputs):
+    rng = np.random.default_rng(n_outputs)
+    X = rng.normal(0, 2, (2000, 3))
+    X[:, 0] = rng.integers(0, 5, 2000)
+    y = X[:, 1:2] * rng.uniform(0.5, 2, n_outputs) + X[:, :1] ** 2
+    return RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0).fit(X, y[:, 0] if n_outputs == 1 else y)
+
+
+def on_thresholds(compiled, n_features, rng):
+    """
+    Rows whose every feature sits exactly on (or one float32 step around) a split threshold.
+    """
+    columns = []
+    for feature in range(n_features):
+        thresholds = compiled.split_thresholds(feature).astype(np.float32)
+        candidates = np.concatenate([thresholds, np.nextafter(thresholds, np.float32(np.inf)),
+                                     np.nextafter(thresholds, np.float32(-np.inf))])
+        columns.append(rng.choice(candidates, 3000))
+    return np.column_stack(columns).astype(np.float64)
+
+
+@pytest.mark.parametrize('model', [
+    fitted_forest(1),
+    fitted_forest(4),
+    pytest.param('fuel', id='fuel-standin'),
+    pytest.param('electricity', id='electricity-standin')
+])
+def test_compiled_forest_matches_model_predict(model):
+    if model == 'fuel':
+        model = fuel_model.get().model
+    elif model == 'electricity':
+        model = electricity_model.get().model
+    compiled = CompiledForest.from_model(model)
+    rng = np.random.default_rng(7)
+
+    X = np.vstack([rng.normal(0, 2, (3000, model.n_features_in_)), on_thresholds(compiled, model.n_features_in_, rng)])
+    expected = model.predict(X)
+    actual = compiled.predict(X)
+
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=1e-12, atol=1e-9)
+    np.testing.assert_allclose(compiled.predict(X[0]), expected[:1], rtol=1e-12, atol=1e-9)
@@ -0,0 +1,42 @@
+import copy
+import numpy as np
+import pandas as pd
+import pytest
+from Fuel.fuel import fuel_model
+from Explosives.explosive import explosive_model
+from Electricity.electricity import electricity_model, predict_emissions_and_risk
+
+# (artifacts, name of their CategoryEncoder attribute, numeric columns after the category)
+MODELS = {
+    'fuel': (fuel_model, 'fuel_encoder', 1),
+    'explosive': (explosive_model, 'explosive_encoder', 1),
+    'electricity': (electricity_model, 'state_encoder', 3)
+}
+
+
+@pytest.mark.parametrize('model', sorted(MODELS))
+def test_fused_features_are_bit_identical_to_scaler(model):
+    registered, encoder_name, n_numeric = MODELS[model]
+    artifacts = registered.get()
+    encoder = getattr(artifacts, encoder_name)
+    rng = np.random.default_rng(3)
+    categories = list(rng.choice(encoder.classes, 500))
+    columns = [rng.uniform(-10, 5000, 500) for _ in range(n_numeric)]
+    columns[0][:3] = [0.0, 1e-300, 123456789.123]
+
+    fused = artifacts.preprocessor.transform(categories, *columns)
+
+    codes = encoder.encode(categories)
+    frame = pd.DataFrame(np.column_stack([codes] + columns),
+                         columns=getattr(artifacts.scaler, 'feature_names_in_', None))
+    expected = artifacts.scaler.transform(frame)
+    assert fused.dtype == expected.dtype
+    assert np.array_equal(fused.view(np.int64), expected.view(np.int64))
+
+
+def test_electricity_leaves_days_data_unchanged(classes):
+    days_data = [{'energyPerTime': 100.0 + day, 'responsibleArea': 10.0, 'totalArea': 500.0} for day in range(5)]
+    original = copy.deepcopy(days_data)
+    predict_emissions_and_risk(days_data, classes['electricity'][0])
+    assert days_data == original
+    assert not any('stateName' in day for day in days_data)
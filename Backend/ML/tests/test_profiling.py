@@ -0,0 +1,37 @@
+import json
+import os
+from conftest import run_service_script
+
+PROFILE_SCRIPT = """
+import json
+import numpy as np
+from benchmarks.payloads import route_payload
+from benchmarks.standins import FUEL_TYPES
+from Common.profiling import RequestProfile
+from app import app
+
+client = app.test_client()
+path, body = route_payload('fuel', np.random.default_rng(0), {'fuel': FUEL_TYPES}, 20)
+headers = {'X-ML-Profile': 'secret'}
+
+# Another capture (e.g. a concurrent request on another thread) is running
+running = RequestProfile('/ml/other').start()
+busy = client.post(path, json=body, headers=headers)
+running.stop()
+profiled = client.post(path, json=body, headers=headers)
+print(json.dumps({
+    'busy': [busy.status_code, busy.headers.get('X-ML-Profile'), busy.headers.get('X-ML-Profile-Id')],
+    'profiled': [profiled.status_code, profiled.headers.get('X-ML-Profile'), profiled.headers.get('X-ML-Profile-Id')]
+}))
+"""
+
+
+def test_overlapping_profile_is_skipped(tmp_path):
+    output = json.loads(run_service_script(PROFILE_SCRIPT, {
+        'ML_PROFILE_TOKEN': 'secret',
+        'ML_PROFILE_DIR': str(tmp_path)
+    }))
+    assert output['busy'] == [200, 'busy', None]
+    status, header, profile_id = output['profiled']
+    assert (status, header) == (200, None)
+    assert any(profile_id in name and name.endswith('.prof') for name in os.listdir(tmp_path))
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from benchmarks.payloads import route_payload
+
+MODELS = ['fuel', 'explosive', 'transport', 'electricity']
+
+
+@pytest.mark.parametrize('model', MODELS)
+@pytest.mark.parametrize('windows', [[0], 'abc', [99999]])
+def test_invalid_rolling_windows_are_a_client_error(client, classes, model, windows):
+    path, body = route_payload(model, np.random.default_rng(0), classes, 14)
+    body['rolling_windows'] = windows
+
+    response = client.post(path, json=body)
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+    response = client.post('/ml/batch', json={'sections': [dict(body, model=model)]})
+    assert response.status_code == 200
+    assert response.get_json()['results'][0]['status'] == 'error'
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_rolling_windows_are_returned(client, classes, model):
+    path, body = route_payload(model, np.random.default_rng(0), classes, 14)
+    body['rolling_windows'] = [7]
+
+    response = client.post(path, json=body)
+    assert response.status_code == 200
+    assert list(response.get_json()['rolling_windows']) == ['7']
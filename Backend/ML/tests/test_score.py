@@ -0,0 +1,43 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from benchmarks.standins import FUEL_TYPES
+from conftest import run_service_script
+
+SCORE_SCRIPT = """
+import sys
+import score
+sys.argv = ['score.py'] + {args!r}
+score.main()
+"""
+
+
+def score(args):
+    run_service_script(SCORE_SCRIPT.format(args=args), {})
+
+
+def test_resumed_run_counts_every_row_once(tmp_path):
+    rng = np.random.default_rng(0)
+    rows = 1000
+    input_path = str(tmp_path / 'fuel.csv')
+    pd.DataFrame({
+        'day': np.sort(rng.integers(1, 366, rows)),
+        'fuel_type': rng.choice(FUEL_TYPES, rows),
+        'volume': rng.uniform(10, 2000, rows).round(2)
+    }).to_csv(input_path, index=False)
+    out = str(tmp_path / 'out')
+    args = ['fuel', input_path, '--out', out, '--chunk-rows', '300', '--processes', '1']
+
+    score(args)
+    # As if the run had been killed before the last chunks were checkpointed
+    os.remove(os.path.join(out, 'chunks', 'chunk-000002.pkl'))
+    os.remove(os.path.join(out, 'chunks', 'chunk-000003.pkl'))
+    score(args)
+
+    with open(os.path.join(out, 'progress.json')) as f:
+        progress = json.load(f)
+    assert progress['complete']
+    assert progress['chunks_resumed'] == 2
+    assert progress['rows_scored'] == rows
+    assert len(pd.read_csv(os.path.join(out, 'predictions.csv'))) == rows
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from Common.surrogate import build_lookup_table
+from Explosives.explosive import explosive_model, predict_encoded
+from Fuel.fuel import fuel_model
+
+
+@pytest.fixture(scope='module', params=['fuel', 'explosive'])
+def forest(request):
+    registered = fuel_model if request.param == 'fuel' else explosive_model
+    artifacts = registered.get()
+    encoder = artifacts.label_encoder if request.param == 'fuel' else artifacts.le
+    return artifacts, build_lookup_table(request.param, artifacts.model, artifacts.scaler, encoder)
+
+
+def test_table_is_exact(forest):
+    _, table = forest
+    assert table.report['max_abs_error'] == 0
+
+
+def test_uncovered_rows_fall_back_to_the_forest(forest):
+    artifacts, table = forest
+    codes = np.array([0, -1, 1, 0, 2])
+    amounts = np.array([120.0, 120.0, np.nan, np.inf, -np.inf])
+
+    _, covered = table.predict(codes, amounts)
+    assert covered.tolist() == [True, False, False, False, False]
+
+    calls = []
+    def fallback(fallback_codes, fallback_amounts):
+        calls.append((fallback_codes, fallback_amounts))
+        return np.full((len(fallback_codes),) + table.tables[0].shape[1:], 7.0)
+
+    predictions = table.predict_with_fallback(codes, amounts, fallback)
+    assert len(calls) == 1
+    np.testing.assert_array_equal(calls[0][0], codes[1:])
+    np.testing.assert_array_equal(calls[0][1], amounts[1:])
+    assert np.all(predictions[1:] == 7.0)
+    assert not np.any(np.isnan(predictions))
+
+
+def test_explosive_fallback_matches_forest():
+    artifacts = explosive_model.get()
+    table = build_lookup_table('explosive', artifacts.model, artifacts.scaler, artifacts.le)
+    codes = np.array([-1, 0, 3])
+    amounts = np.array([250.0, 250.0, 4000.0])
+    np.testing.assert_array_equal(table.predict_with_fallback(codes, amounts, predict_encoded),
+                                  predict_encoded(codes, amounts))